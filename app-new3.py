@@ -1,19 +1,28 @@
 import os
+import atexit
 import sys
 import time
 import random
 import logging
+import re
 import hashlib
+import gzip
+import json
 import shutil
 import math
-from datetime import datetime, timedelta
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from types import MappingProxyType
+from functools import lru_cache
 from pathlib import Path
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
+from flask import Flask, request, jsonify, send_from_directory, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from midiutil import MIDIFile
+from werkzeug.exceptions import HTTPException, NotFound
+from werkzeug.security import safe_join
 import subprocess
-import tempfile
-from textblob import TextBlob
 import pyphen
 
 # Import pyfluidsynth dengan error handling (opsional)
@@ -24,7 +33,12 @@ except ImportError:
     FLUIDSYNTH_BINDING_AVAILABLE = False
     logger = logging.getLogger(__name__)
 
-from pydub import AudioSegment
+# orjson untuk response JSON (opsional, fallback ke json bawaan Flask)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Konfigurasi logging
 logging.basicConfig(
@@ -41,6 +55,28 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+class OrJSONProvider(DefaultJSONProvider):
+    """jsonify() via orjson (C serializer); status polling makes JSON the hottest response"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if ORJSON_AVAILABLE:
+    app.json_provider_class = OrJSONProvider
+    app.json = OrJSONProvider(app)
+
+# Batas ukuran input: lirik max 16 KB, body request max 64 KB (ditolak sebelum parsing)
+MAX_LYRICS_LENGTH = 16 * 1024
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024
+
+# File serving: default cache lifetime for static assets (audio sets its own, immutable),
+# and X-Sendfile for Apache/lighttpd front-ends (nginx: see AUDIO_ACCEL_REDIRECT_PREFIX).
+# Leave USE_X_SENDFILE off when running without such a front-end: the body would be empty.
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
+app.config['USE_X_SENDFILE'] = False
+
 # Path konfigurasi
 BASE_DIR = Path(__file__).parent
 STATIC_DIR = BASE_DIR / 'static'
@@ -64,6 +100,21 @@ for candidate in SOUNDFONT_CANDIDATES:
 if not SOUNDFONT_PATH:
     logger.warning("No SoundFont found. Download from: https://musical-artifacts.com/artifacts/661")
 
+# FFmpeg binary + MP3 encoder arguments (resolved once at startup, not per request)
+FFMPEG_BIN = shutil.which('ffmpeg')
+MP3_AUDIO_FILTERS = (
+    "compand=attacks=0.3:decays=1:points=-80/-90|-40/-40|-20/-20|0/-10",
+    "bass=g=6:f=100:w=0.5",
+    "loudnorm=I=-16:TP=-1.5:LRA=11",
+)
+MP3_ENCODER_ARGS = (
+    '-af', ','.join(MP3_AUDIO_FILTERS),  # Filter chain must be comma-separated
+    '-b:a', '192k',
+    '-ar', '44100',  # Sample rate
+    '-ac', '2',      # Stereo
+    '-f', 'mp3',     # Explicit muxer (output goes to a .part file)
+)
+
 # Create directories
 os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
 
@@ -87,19 +138,17 @@ def check_python_dependencies():
     
     deps = {
         'Flask-CORS': check_module('flask_cors'),
-        'MIDIUtil': check_module('midiutil'),
-        'TextBlob': check_module('textblob'),        # ← FIXED
+        'orjson': check_module('orjson'),
         'Pyphen': check_module('pyphen'),
-        'Pydub': check_module('pydub'),
     }
     
     available_deps = [name for name, available in deps.items() if available]
-    logger.info("Python dependencies detected: {}".format(', '.join(available_deps)))
+    logger.info("Python dependencies detected: %s", ', '.join(available_deps))
     return available_deps
 
 
 # General MIDI Instruments (case-insensitive matching)
-INSTRUMENTS = {
+INSTRUMENTS = MappingProxyType({
     # Piano
     'Acoustic Grand Piano': 0, 'Bright Acoustic Piano': 1, 'Electric Grand Piano': 2,
     'Honky-tonk Piano': 3, 'Electric Piano 1': 4, 'Electric Piano 2': 5,
@@ -166,61 +215,65 @@ INSTRUMENTS = {
     # Indonesian Instruments (approximations)
     'Gamelan': 114, 'Kendang': 115, 'Suling': 75, 'Rebab': 110,
     'Talempong': 14, 'Gambus': 25, 'Mandolin': 27, 'Harmonica': 22,
-}
+})
+
+# Lowercase lookup tables for find_best_instrument (built once, not per request)
+_INSTRUMENTS_LOWER = {k.lower(): (k, v) for k, v in INSTRUMENTS.items()}
+_INSTRUMENT_WORDS = {k.lower(): frozenset(k.lower().split()) for k in INSTRUMENTS}
 
 # Chords (MIDI note numbers, C4 = 60)
-CHORDS = {
+CHORDS = MappingProxyType({
     # Major chords
-    'C': [60, 64, 67], 'C#': [61, 65, 68], 'Db': [61, 65, 68],
-    'D': [62, 66, 69], 'D#': [63, 67, 70], 'Eb': [63, 67, 70],
-    'E': [64, 68, 71], 'F': [65, 69, 72], 'F#': [66, 70, 73],
-    'Gb': [66, 70, 73], 'G': [67, 71, 74], 'G#': [68, 72, 75],
-    'Ab': [68, 72, 75], 'A': [69, 73, 76], 'A#': [70, 74, 77],
-    'Bb': [70, 74, 77], 'B': [71, 75, 78],
+    'C': (60, 64, 67), 'C#': (61, 65, 68), 'Db': (61, 65, 68),
+    'D': (62, 66, 69), 'D#': (63, 67, 70), 'Eb': (63, 67, 70),
+    'E': (64, 68, 71), 'F': (65, 69, 72), 'F#': (66, 70, 73),
+    'Gb': (66, 70, 73), 'G': (67, 71, 74), 'G#': (68, 72, 75),
+    'Ab': (68, 72, 75), 'A': (69, 73, 76), 'A#': (70, 74, 77),
+    'Bb': (70, 74, 77), 'B': (71, 75, 78),
 
     # Minor chords
-    'Cm': [60, 63, 67], 'C#m': [61, 64, 68], 'Dm': [62, 65, 69],
-    'D#m': [63, 66, 70], 'Em': [64, 67, 71], 'Fm': [65, 68, 72],
-    'F#m': [66, 69, 73], 'Gm': [67, 70, 74], 'G#m': [68, 71, 75],
-    'Am': [69, 72, 76], 'A#m': [70, 73, 77], 'Bm': [71, 74, 78],
+    'Cm': (60, 63, 67), 'C#m': (61, 64, 68), 'Dm': (62, 65, 69),
+    'D#m': (63, 66, 70), 'Em': (64, 67, 71), 'Fm': (65, 68, 72),
+    'F#m': (66, 69, 73), 'Gm': (67, 70, 74), 'G#m': (68, 71, 75),
+    'Am': (69, 72, 76), 'A#m': (70, 73, 77), 'Bm': (71, 74, 78),
 
     # Seventh chords
-    'C7': [60, 64, 67, 70], 'D7': [62, 66, 69, 72], 'E7': [64, 68, 71, 74],
-    'F7': [65, 69, 72, 75], 'G7': [67, 71, 74, 77],
-    'Cm7': [60, 63, 67, 70], 'Fm7': [65, 68, 72, 75], 'Bbmaj7': [70, 74, 77, 81],
-    'Cm9': [60, 63, 67, 70, 74], 'Fm9': [65, 68, 72, 75, 79],
-    'Ebmaj7': [63, 67, 70, 74], 'Gmaj7': [67, 71, 74, 78], 'Cmaj7': [60, 64, 67, 71],
+    'C7': (60, 64, 67, 70), 'D7': (62, 66, 69, 72), 'E7': (64, 68, 71, 74),
+    'F7': (65, 69, 72, 75), 'G7': (67, 71, 74, 77),
+    'Cm7': (60, 63, 67, 70), 'Fm7': (65, 68, 72, 75), 'Bbmaj7': (70, 74, 77, 81),
+    'Cm9': (60, 63, 67, 70, 74), 'Fm9': (65, 68, 72, 75, 79),
+    'Ebmaj7': (63, 67, 70, 74), 'Gmaj7': (67, 71, 74, 78), 'Cmaj7': (60, 64, 67, 71),
 
     # Suspended chords
-    'Csus4': [60, 65, 67], 'Dsus4': [62, 67, 69], 'Esus4': [64, 69, 71],
-    'Fsus4': [65, 70, 72], 'Gsus4': [67, 72, 74], 'Asus4': [69, 74, 76],
+    'Csus4': (60, 65, 67), 'Dsus4': (62, 67, 69), 'Esus4': (64, 69, 71),
+    'Fsus4': (65, 70, 72), 'Gsus4': (67, 72, 74), 'Asus4': (69, 74, 76),
 
     # Diminished chords
-    'Cdim': [60, 63, 66], 'Ddim': [62, 65, 68], 'Edim': [64, 67, 70],
-    'Fdim': [65, 68, 71], 'Gdim': [67, 70, 73], 'Adim': [69, 72, 75],
+    'Cdim': (60, 63, 66), 'Ddim': (62, 65, 68), 'Edim': (64, 67, 70),
+    'Fdim': (65, 68, 71), 'Gdim': (67, 70, 73), 'Adim': (69, 72, 75),
 
     # Augmented chords
-    'Caug': [60, 64, 68], 'Daug': [62, 66, 70], 'Eaug': [64, 68, 72],
-    'Faug': [65, 69, 73], 'Gaug': [67, 71, 75], 'Aaug': [69, 73, 77],
-}
+    'Caug': (60, 64, 68), 'Daug': (62, 66, 70), 'Eaug': (64, 68, 72),
+    'Faug': (65, 69, 73), 'Gaug': (67, 71, 75), 'Aaug': (69, 73, 77),
+})
 
 # Scales (intervals from root note)
-SCALES = {
-    'major': [0, 2,, 5, 7, 9, 11],
-    'minor': [0, 2, 3, 5, 7, 8, 10],
-    'dorian': [0, 2, 3, 5, 7, 9, 10],
-    'phrygian': [0, 1, 3, 5, 7, 8, 10],
-    'lydian': [0, 2, 4, 6, 79, 11],
-    'mixolydian': [0, 2, 4, 5, 7, 9, 10],
-    'locrian': [0, 1, 3, 5, 6, 8, 10],
-    'blues': [0, 3, 5, 6, 7, 10],
-    'pentatonic': [0, 3, 5, 7, 10],
-    'latin': [0, 2, 4, 5, 7, 9, 10],
-    'dangdut': [0, 1, 4, 5, 7, 8, 11],
-}
+SCALES = MappingProxyType({
+    'major': (0, 2, 4, 5, 7, 9, 11),
+    'minor': (0, 2, 3, 5, 7, 8, 10),
+    'dorian': (0, 2, 3, 5, 7, 9, 10),
+    'phrygian': (0, 1, 3, 5, 7, 8, 10),
+    'lydian': (0, 2, 4, 6, 7, 9, 11),
+    'mixolydian': (0, 2, 4, 5, 7, 9, 10),
+    'locrian': (0, 1, 3, 5, 6, 8, 10),
+    'blues': (0, 3, 5, 6, 7, 10),
+    'pentatonic': (0, 3, 5, 7, 10),
+    'latin': (0, 2, 4, 5, 7, 9, 10),
+    'dangdut': (0, 1, 4, 5, 7, 8, 11),
+})
 
 # Genre parameters
-GENRE_PARAMS = {
+GENRE_PARAMS = MappingProxyType({
     'pop': {
         'tempo': 126, 'key': 'C', 'scale': 'major',
         'instruments': {
@@ -229,7 +282,7 @@ GENRE_PARAMS = {
             'bass': ['Electric Bass finger', 'Acoustic Bass'],
         },
         'drums_enabled': True,
-chord_progression': ['C', 'G', 'Am', 'F'],
+        'chord_progression': ['C', 'G', 'Am', 'F'],
         'duration_beats': 128,
         'mood': 'happy'
     },
@@ -286,10 +339,10 @@ chord_progression': ['C', 'G', 'Am', 'F'],
         'instruments': {
             'melody': ['Tenor Sax', 'Jazz Electric Guitar'],
             'harmony': ['Electric Piano 1', 'Brass Section', 'String Ensemble 1'],
- Bass', 'Electric Bass finger'],
+            'bass': ['Acoustic Bass', 'Electric Bass finger'],
         },
-        'drums_enabled,
-       _progression': ['Cm7', 'Fm7', 'Bbmaj7', 'Ebmaj7'],
+        'drums_enabled': True,
+        'chord_progression': ['Cm7', 'Fm7', 'Bbmaj7', 'Ebmaj7'],
         'duration_beats': 128,
         'mood': 'sophisticated'
     },
@@ -326,34 +379,74 @@ chord_progression': ['C', 'G', 'Am', 'F'],
         },
         'drums_enabled': True,
         'chord_progression': ['Am', 'Dm', 'G', 'C'],
-        'duration_beats':,
+        'duration_beats': 128,
         'mood': 'traditional'
     }
+})
+
+def resolve_chord_progression(progression):
+    """Chord names -> tuple of MIDI note tuples (unknown chords fall back to C major)"""
+    resolved = []
+    for chord_name in progression:
+        if chord_name not in CHORDS:
+            logger.warning("Chord '%s' not found. Using C major.", chord_name)
+        resolved.append(CHORDS.get(chord_name, CHORDS['C']))
+    return tuple(resolved)
+
+# Chord progressions resolved once at import, not per request
+for genre_params in GENRE_PARAMS.values():
+    genre_params['chord_progression_midi'] = resolve_chord_progression(genre_params['chord_progression'])
+
+# Genre keyword sets (built once at import; lookups are hashed set intersections)
+GENRE_KEYWORDS = {
+    'pop': frozenset(['love', 'heart', 'dream', 'dance', 'party', 'fun', 'happy', 'tonight', 'forever', 'together']),
+    'rock': frozenset(['rock', 'guitar', 'energy', 'power', 'fire', 'wild', 'roll', 'scream', 'freedom']),
+    'metal': frozenset(['metal', 'heavy', 'dark', 'scream', 'thunder', 'steel', 'rage', 'shadow', 'death']),
+    'ballad': frozenset(['sad', 'love', 'heartbreak', 'memory', 'gentle', 'soft', 'tears', 'alone', 'forever']),
+    'blues': frozenset(['soul', 'heartache', 'guitar', 'night', 'trouble', 'baby', 'lonely']),
+    'jazz': frozenset(['jazz', 'smooth', 'night', 'sax', 'swing', 'harmony', 'blue', 'lounge']),
+    'hiphop': frozenset(['rap', 'street', 'beat', 'flow', 'rhythm', 'hustle', 'city', 'rhyme', 'crew']),
+    'latin': frozenset(['latin', 'bossanova', 'salsa', 'rhythm', 'dance', 'passion', 'fiesta', 'caliente', 'amor']),
+    'dangdut': frozenset(['dangdut', 'tradisional', 'cinta', 'hati', 'kenangan', 'indonesia', 'rindu', 'sayang', 'melayu'])
 }
 
-def detect_genre_from_lyrics(lyrics):
-    """Detect genre from lyrics using keyword matching"""
-    keywords = {
-        'pop': ['love', 'heart', 'dream', 'dance', 'party', 'fun', 'happy', 'tonight', 'forever', 'together'],
-        'rock': ['rock', 'guitar', 'energy', 'power', 'fire', 'wild', 'roll', 'scream', 'freedom'],
-        'metal': ['metal', 'heavy', 'dark', 'scream', 'thunder', 'steel', 'rage', 'shadow', 'death'],
-        'ballad': ['sad', 'love', 'heartbreak', 'memory', 'gentle', 'soft', 'tears', 'alone', 'forever'],
-        'blues': ['soul', 'heartache', 'guitar', 'night', 'trouble', 'baby', 'lonely'],
-        'jazz': ['jazz', 'smooth', 'night', 'sax', ' 'swing', 'harmony', 'blue', 'lounge'],
-        'hiphop': ['rap', 'street', 'beat', 'flow', 'rhythm', 'hustle', 'city',yme', 'crew'],
-        'latin': ['latin', 'bossanova', 'salsa', 'rhythm', 'dance', 'passion', 'fiesta', 'caliente', 'amor'],
-        'dangdut': ['dangdut', 'tradisional', 'cinta', 'hati', 'kenangan', 'indonesia', 'rindu', 'sayang', 'melayu']
-    }
+# All genre keywords as one compiled alternation (longest first, whole words only)
+GENRE_KEYWORD_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(sorted((re.escape(kw) for kws in GENRE_KEYWORDS.values() for kw in kws),
+                                key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
 
-    blob = TextBlob(lyrics.lower())
-    words = set(blob.words)
+# Tanda baca -> spasi, supaya "love," tetap cocok dengan "love"
+PUNCTUATION_TO_SPACE = str.maketrans({c: ' ' for c in '.,!?;:"()[]{}-_/\\*&^%$#@~`+=<>|'})
+
+# Sentiment lexicon (English + Bahasa Indonesia) for the mood override
+POSITIVE_WORDS = frozenset([
+    'love', 'happy', 'joy', 'smile', 'laugh', 'bright', 'sun', 'sunshine', 'shine', 'hope',
+    'dream', 'beautiful', 'wonderful', 'amazing', 'good', 'great', 'sweet', 'kiss', 'dance', 'party',
+    'fun', 'free', 'freedom', 'together', 'forever', 'alive', 'celebrate', 'glory', 'peace', 'heaven',
+    'light', 'warm', 'best', 'win', 'fly', 'gold', 'paradise', 'lucky', 'delight', 'cheer',
+    'cinta', 'bahagia', 'senang', 'gembira', 'indah', 'cantik', 'senyum', 'tawa', 'harapan', 'mimpi',
+    'sayang', 'kasih', 'damai', 'ceria', 'suka', 'riang', 'manis', 'terang', 'semangat', 'bersama',
+])
+NEGATIVE_WORDS = frozenset([
+    'sad', 'cry', 'tears', 'pain', 'hurt', 'broken', 'heartbreak', 'heartache', 'alone', 'lonely',
+    'lost', 'dark', 'darkness', 'death', 'die', 'dead', 'fear', 'hate', 'anger', 'rage',
+    'cold', 'empty', 'goodbye', 'sorrow', 'grief', 'regret', 'miss', 'never', 'fall', 'bleed',
+    'scream', 'shadow', 'storm', 'trouble', 'blue', 'gone', 'wrong', 'lie', 'lies', 'fight',
+    'sedih', 'tangis', 'menangis', 'duka', 'luka', 'sakit', 'patah', 'sendiri', 'sepi', 'hilang',
+    'gelap', 'mati', 'takut', 'benci', 'marah', 'pisah', 'perpisahan', 'kecewa', 'derita', 'pilu',
+])
+
+@lru_cache(maxsize=256)
+def detect_genre_from_lyrics(lyrics):
+    """Detect genre from lyrics using keyword matching (memoized; retries repeat the same lyrics)"""
+    # One C-level regex pass finds every keyword; only the (few) hits reach Python
+    words = {match.lower() for match in GENRE_KEYWORD_PATTERN.findall(lyrics)}
 
-    scores = {genre: sum(1 for keyword in kw_list if keyword in words)
-              for genre, kw_list in keywords.items()}
+    scores = {genre: len(words & kw_set) for genre, kw_set in GENRE_KEYWORDS.items()}
 
-    detected_genre = max(scores, key=scores.get) if max(scores.values()) > 0 else 'pop'
-    logger.info("Genre detected from keywords: '{}'".format(detected_genre))
-    return detected_genre
+    return max(scores, key=scores.get) if max(scores.values()) > 0 else 'pop'
 
 def find_best_instrument(choice_list):
     """Fuzzy matching for instruments (case-insensitive + partial match)"""
@@ -363,14 +456,14 @@ def find_best_instrument(choice_list):
     for choice in choice_list:
         choice_lower = choice.lower().strip()
         # Exact match (case-insensitive)
-        for num in INSTRUMENTS.items():
-            if choice_lower == instr.lower():
- instr
+        exact = _INSTRUMENTS_LOWER.get(choice_lower)
+        if exact is not None:
+            return exact[0]
         # Partial match
-        for instr, num in INSTRUMENTS.items():
-            if (choice_lower in instr.lower() or 
-                any(word in instr.lower() for word in choice_lower.split())):
-                return instr
+        choice_words = frozenset(choice_lower.split())
+        for instr_lower, words in _INSTRUMENT_WORDS.items():
+            if choice_lower in instr_lower or choice_words & words:
+                return _INSTRUMENTS_LOWER[instr_lower][0]
     
     # Fallback by category keywords
     if any(word in choice_lower for word in ['guitar', 'lead', 'solo']):
@@ -386,22 +479,46 @@ def find_best_instrument(choice_list):
 
 def get_music_params_from_lyrics(genre, lyrics, user_tempo_input='auto'):
     """Generate music parameters based on genre and lyrics analysis"""
-    params = GENRE_PARAMS.get(genre.lower(), GENRE_PARAMS['pop']).copy()
+    tempo = GENRE_PARAMS.get(genre.lower(), GENRE_PARAMS['pop'])['tempo']
 
     # Override tempo if user specified
     if user_tempo_input != 'auto':
         try:
-            params['tempo'] = int(user_tempo_input)
-            if not (60 <= params['tempo'] <= 200):
-                logger.warning("Tempo out of range (60-200 BPM): {}, using default.".format(user_tempo_input))
-                params['tempo'] = GENRE_PARAMS[genre.lower()]['tempo']
+            if 60 <= int(user_tempo_input) <= 200:
+                tempo = int(user_tempo_input)
+            else:
+                logger.warning("Tempo out of range (60-200 BPM): %s, using default.", user_tempo_input)
         except ValueError:
-            logger.warning("Invalid tempo input: '{}', using default.".format(user_tempo_input))
-            params['tempo'] = GENRE_PARAMS[genre.lower()]['tempo']
+            logger.warning("Invalid tempo input: '%s', using default.", user_tempo_input)
+
+    # The memoized value is read-only; callers get their own dict and instruments map
+    cached = compute_music_params(genre, lyrics, tempo)
+    params = {**cached, 'instruments': dict(cached['instruments'])}
 
-    # Sentiment analysis for mood adjustment
-    blob = TextBlob(lyrics)
-    sentiment = blob.sentiment.polarity
+    # Logged here rather than in the memoized part, so cache hits are reported too
+    for category, selected in params['instruments'].items():
+        logger.info("%s instrument: %s (Program %s)",
+            category.capitalize(), selected, INSTRUMENTS.get(selected, 0)
+        )
+
+    # Lazy %-args: the message is only formatted if INFO is enabled
+    logger.info("Parameter musik untuk genre '%s' (Mood: %s): Tempo=%sBPM, Durasi=%s beats",
+        genre, params['mood'], params['tempo'], params['duration_beats']
+    )
+
+    return params
+
+@lru_cache(maxsize=256)
+def compute_music_params(genre, lyrics, tempo):
+    """Pure part of get_music_params_from_lyrics, memoized per (genre, lyrics, tempo) as a read-only mapping"""
+    params = GENRE_PARAMS.get(genre.lower(), GENRE_PARAMS['pop']).copy()
+    params['tempo'] = tempo
+
+    # Sentiment analysis for mood adjustment (lexicon count, -1.0 .. 1.0)
+    words = set(lyrics.lower().translate(PUNCTUATION_TO_SPACE).split())
+    positive = len(words & POSITIVE_WORDS)
+    negative = len(words & NEGATIVE_WORDS)
+    sentiment = (positive - negative) / max(positive + negative, 1)
 
     if sentiment < -0.3:
         params['mood'] = 'sad'
@@ -410,40 +527,34 @@ def get_music_params_from_lyrics(genre, lyrics, user_tempo_input='auto'):
         params['mood'] = 'happy'
         params['scale'] = 'major'
 
-    # Select instruments with fuzzy matching
+    # Select instruments with fuzzy matching (own copy; GENRE_PARAMS is shared)
+    params['instruments'] = dict(params['instruments'])
     for category, instrument_choices in params['instruments'].items():
-        selected = find_best_instrument(instrument_choices)
-        params['instruments'][category] = selected
-        program_num = INSTRUMENTS.get(selected, 0)
-        logger.info("{} instrument: {} (Program {})".format(
-            category.capitalize(), selected, program_num
-        ))
-
-    # Generate chord progression
-    base_chords = params['chord_progression']
-    selected_chords = []
-    for chord_name in base_chords:
-        if chord_name in CHORDS:
-            selected_chords.append(CHORDS[chord_name])
-        else:
-            logger.warning("Chord '{}' not found. Using C major.".format(chord_name))
-            selected_chords.append(CHORDS['C'])
-    params['chords'] = selected_chords
+        params['instruments'][category] = find_best_instrument(instrument_choices)
+
+    # Chord progression (resolved to MIDI notes at import)
+    params['chords'] = params['chord_progression_midi']
 
     params['genre'] = genre
-    
-    # FIXED: Use .format() instead of f-string to avoid quote issues
-    logger.info("Parameter musik untuk (Mood: {}): Tempo={}BPM, Durasi={} beats".format(
-        genre, params['mood'], params['tempo'], params['duration_beats']
-    ))
-    
-    return params
 
-def get_scale_notes(key, scale_name """Get based on key and scale type"""
-    root_midi = CHORDS.get(key, [60])[0]
-    scale = SC(scale_nameALES['major'])
+    # Frozen (instruments included) so no caller can corrupt later cache hits
+    params['instruments'] = MappingProxyType(params['instruments'])
+    return MappingProxyType(params)
+
+def get_scale_notes(key, scale_name):
+    """Get scale notes based on key and scale type"""
+    root_midi = CHORDS.get(key, (60,))[0]
+    scale_intervals = SCALES.get(scale_name, SCALES['major'])
     return [root_midi + interval for interval in scale_intervals]
 
+# Melody rhythm patterns (beat lengths) + velocities per mood
+MELODY_STYLES = MappingProxyType({
+    'sad': (((1, 0.5, 1, 0.5, 2), (0.5, 0.5, 1, 1.5, 1), (1, 1, 0.5, 0.5, 2)), (60, 70)),
+    'energetic': (((0.5, 0.5, 1, 0.5, 0.5, 1), (0.5, 0.5, 0.5, 0.5, 1, 2), (1, 1, 1, 1)), (90, 100)),
+    'rhythmic': (((0.5, 0.5, 1, 0.5, 0.5, 1), (1, 0.5, 0.5, 1, 1), (0.5, 1, 0.5, 1, 1)), (80, 90)),
+    'default': (((1, 1, 0.5, 0.5, 1.5), (0.5, 1, 1.5, 1), (1, 1, 2)), (70, 85)),
+})
+
 def generate_melody(params):
     """Generate melody line based on scale and mood"""
     scale_notes = get_scale_notes(params['key'], params['scale'])
@@ -453,21 +564,24 @@ def generate_melody(params):
 
     # Melody patterns based on mood
     if params['mood'] == 'sad':
-        patterns = [[1, 0.5, 10.5, 2], [0.5, 0.5, 1, 1.5, 1], [1, 1, 0.5, 0.5, 2]]
-        velocities = [60, 70]
+        patterns, velocities = MELODY_STYLES['sad']
     elif params['mood'] == 'energetic':
-        patterns = [[0.5, 0.5, 1, 0.5, 0.5, 1], [0.5, 0.5, 0.5, 0.5, 1, 2], [1, 1, 1, 1]]
-        velocities = [90, 100]
+        patterns, velocities = MELODY_STYLES['energetic']
     elif params['mood'] == 'rhythmic' or params['genre'] in ['latin', 'dangdut']:
-        patterns = [[0.5, 0.5, 1, 0.5, 0, 1], [1, 0.5, 0.5, 1, 1], [0.5, 1, 0.5, 1, 1]]
-        velocities = [80, 90]
+        patterns, velocities = MELODY_STYLES['rhythmic']
     else:
-11, 0.5, 0.5, 1.5],. 1, 1.5, 1], [1, 1, 2]]
-        velocities = [70, 85]
+        patterns, velocities = MELODY_STYLES['default']
 
     current_pattern = random.choice(patterns)
     current_velocity = random.choice(velocities)
 
+    # Every (scale note, octave shift) pair is equally likely, so the clamped
+    # pitch pool is built once and each note is a single choice() call
+    pitch_pool = [max(0, min(127, note + octave_shift))
+                  for octave_shift in (-12, 0, 12) for note in scale_notes]
+    choice = random.choice
+    add_note = melody.append
+
     total_beats_generated = 0
     time_pos = 0.0
     
@@ -479,634 +593,825 @@ def generate_melody(params):
                     break
 
             # Select note from scale with octave variation
-           emotional']:
+            add_note((choice(pitch_pool), time_pos, beat_duration, current_velocity))
+            time_pos += beat_duration
+            total_beats_generated += beat_duration
+            if total_beats_generated >= duration_beats:
+                break
+
+        # Change pattern every 16 beats
+        if (total_beats_generated / 4) % 4 == 0 and total_beats_generated > 0:
+            current_pattern = random.choice(patterns)
+            current_velocity = random.choice(velocities)
+
+    return melody
+
+def generate_harmony(params):
+    """Generate sustained chord harmony"""
+    chords = params['chords']
+    duration_beats = params['duration_beats']
+
+    harmony = []
+    beats_per_chord = duration_beats // len(chords)
+
+    if params['mood'] in ['sad', 'emotional']:
+        velocity = 50
+    elif params['mood'] in ['energetic', 'intense']:
+        velocity = 70
+    else:
+        velocity = 60
+
+    current_beat = 0.0
+    for i, chord_notes in enumerate(chords):
+        chord_duration = beats_per_chord
+        if i == len(chords) - 1:
+            chord_duration = duration_beats - current_beat
+
+        if chord_duration <= 0.001:
+            break
+
+        for note in chord_notes:
+            harmony.append((note, current_beat, chord_duration, velocity))
+
+        current_beat += chord_duration
+
+    return harmony
+
+def generate_bass_line(params):
+    """Generate bass line (root on the beat, fifth on the off-beat)"""
+    chords = params['chords']
+    duration_beats = params['duration_beats']
+
+    bass_line = []
+    beats_per_chord = duration_beats // len(chords)
+
+    if params['mood'] in ['sad', 'emotional']:
         velocity = 70
     elif params['mood'] in ['energetic', 'intense']:
         velocity = 100
     else:
         velocity = 85
 
+    offbeat_velocity = velocity - 15
+    add_note = bass_line.append
+
     current_beat = 0.0
-    for i_notes in enumerate(chords):
-        root_note[0] - 24  # Bass one octave lower
-        root_note = max(24, min(root_note48))  # Bass range limit
+    for i, chord_notes in enumerate(chords):
+        root_note = chord_notes[0] - 24  # Bass one octave lower
+        root_note = max(24, min(root_note, 48))  # Bass range limit
 
         chord_duration = beats_per_chord
         if i == len(chords) - 1:
-            chord_duration = duration - current_beat
+            chord_duration = duration_beats - current_beat
 
         if chord_duration <= 0.001:
             break
 
+        # Fifth interval on off-beats, fallback to root if it leaves the bass range
+        offbeat_note = root_note + 7 if root_note + 7 <= 48 else root_note
+
         # Use math.ceil for integer beats
         num_beats = math.ceil(chord_duration)
- beat_in_chord in range(min(num_beats, int(chord_duration))):
+        for beat_in_chord in range(num_beats):
+            beat_pos = current_beat + beat_in_chord
             # Root note on main beats
-            bass_line.append((root_note, current_beat + beat_in_chord, 1.0, velocity))
-            
-            # Fifth interval on off-beats
+            add_note((root_note, beat_pos, 1.0, velocity))
             if beat_in_chord + 0.5 < chord_duration:
-                fifth_note = root_note + 7
-                if fifth_note <= 48:  # Keep in bass range
-                    bass_line.append((fifth_note, current_beat + beat_in_chord + 0. 5, velocity -                 else:
-                   allback to root
-                    bass_line.append((root_note, current_beat + beat_in_chord + 0.5, 0.5, velocity - 15))
+                add_note((offbeat_note, beat_pos + 0.5, 0.5, offbeat_velocity))
 
         current_beat += chord_duration
 
-
+    return bass_line
+
+# MIDI writer: events are collected as plain tuples and sorted once per track,
+# instead of going through MIDIFile.addNote for every note
+MIDI_TICKS_PER_BEAT = 480
+MIDI_EVENT_META = 0       # Sort order at equal ticks: meta/program first,
+MIDI_EVENT_NOTE_OFF = 1   # then note-offs (so repeated pitches re-trigger),
+MIDI_EVENT_NOTE_ON = 2    # then note-ons
+
+def note_events(channel, pitch, start_beat, duration, velocity):
+    """Note-on/note-off event pair for the MIDI writer"""
+    return ((int(round(start_beat * MIDI_TICKS_PER_BEAT)), MIDI_EVENT_NOTE_ON,
+             bytes((0x90 | channel, pitch, velocity))),
+            (int(round((start_beat + duration) * MIDI_TICKS_PER_BEAT)), MIDI_EVENT_NOTE_OFF,
+             bytes((0x80 | channel, pitch, 0))))
+
+@lru_cache(maxsize=None)
+def drum_groove_events(total_beats):
+    """Kick/snare/hi-hat events of the 4/4 groove; deterministic, so built once per song length"""
+    events = []
+    for beat_pos in range(0, total_beats, 2):    # Kick drum (36) on beats 1 & 3
+        events += note_events(9, 36, beat_pos, 0.5, 110)
+    for beat_pos in range(1, total_beats, 2):    # Snare drum (38) on beats 2 & 4
+        events += note_events(9, 38, beat_pos, 0.5, 95)
+    for beat_pos in range(total_beats):          # Hi-hat (42) every beat
+        events += note_events(9, 42, beat_pos, 0.25, 75)
+    return tuple(events)
+
+# Every genre uses a fixed song length, so the grooves can be built at import
+for genre_params in GENRE_PARAMS.values():
+    drum_groove_events(int(genre_params['duration_beats']))
+
+def encode_var_len(value):
+    """Encode an int as a MIDI variable-length quantity"""
+    buffer = value & 0x7F
+    value >>= 7
+    out = bytearray()
+    while value:
+        buffer = (buffer << 8) | ((value & 0x7F) | 0x80)
+        value >>= 7
+    while True:
+        out.append(buffer & 0xFF)
+        if buffer & 0x80:
+            buffer >>= 8
+        else:
+            break
+    return bytes(out)
+
+def write_midi_tracks(output_path, tracks):
+    """Write a format-1 MIDI file; each track is a list of (tick, order, event_bytes)"""
+    chunks = [b'MThd', (6).to_bytes(4, 'big'), (1).to_bytes(2, 'big'),
+              len(tracks).to_bytes(2, 'big'), MIDI_TICKS_PER_BEAT.to_bytes(2, 'big')]
+    for events in tracks:
+        events.sort()
+        data = bytearray()
+        last_tick = 0
+        for tick, _order, event in events:
+            data += encode_var_len(tick - last_tick)
+            data += event
+            last_tick = tick
+        data += b'\x00\xff\x2f\x00'  # End of track
+        chunks += [b'MTrk', len(data).to_bytes(4, 'big'), bytes(data)]
+
+    with open(output_path, 'wb') as f:
+        f.write(b''.join(chunks))
 
 def create_midi_file(params, output_path):
     """Create multi-track MIDI file with channel isolation"""
     tempo = params['tempo']
     duration_beats = params['duration_beats']
 
-    # 4 tracks: Melody( Harmony(1), Bass(2), Drums(9)
-    midi = MIDIFile(4, ticks_per_beat=120)
-
-    # Set tempo for all tracks
-    for i in range(4):
-        midi.addTempo(i, 0, tempo)
+    # 4 tracks: Melody(0), Harmony(1), Bass(2), Drums(9)
+    tracks = [[] for _ in range(4)]
+
+    def add_note(track, channel, pitch, start_beat, duration, velocity):
+        tracks[track] += note_events(channel, pitch, start_beat, duration, velocity)
+
+    def add_part(track, channel, notes, velocity_scale, max_duration):
+        # Whole generated part in one pass: event slots preallocated, filled by index
+        note_on, note_off = 0x90 | channel, 0x80 | channel
+        events = [None] * (2 * len(notes))
+        n = 0
+        for pitch, start_beat, duration, velocity in notes:
+            duration = min(duration, max_duration)
+            if duration <= 0.25:  # Minimum duration
+                continue
+            velocity = min(127, int(velocity * velocity_scale))
+            events[n] = (int(round(start_beat * MIDI_TICKS_PER_BEAT)), MIDI_EVENT_NOTE_ON,
+                         bytes((note_on, pitch, velocity)))
+            events[n + 1] = (int(round((start_beat + duration) * MIDI_TICKS_PER_BEAT)), MIDI_EVENT_NOTE_OFF,
+                             bytes((note_off, pitch, 0)))
+            n += 2
+        tracks[track] += events[:n]
+
+    def add_program_change(track, channel, program_num):
+        tracks[track].append((0, MIDI_EVENT_META, bytes((0xC0 | channel, program_num))))
+
+    # Set tempo (conductor lives on the first track in format 1)
+    tracks[0].append((0, MIDI_EVENT_META, b'\xff\x51\x03' + (60000000 // tempo).to_bytes(3, 'big')))
 
     # Track 0: Melody (Channel 0)
     melody_instrument = params['instruments']['melody']
     if melody_instrument:
         program_num = INSTRUMENTS.get(melody_instrument, 0)
-        midi.addProgramChange(0, 0, 0, program_num)
-        logger.info("Melody track: {} (Program {}, Channel 0)".format(melody_instrument, program_num))
+        add_program_change(0, 0, program_num)
+        logger.info("Melody track: %s (Program %s, Channel 0)", melody_instrument, program_num)
 
-        melody_notes =elody(params)
-        for pitch, time in melody_notes:
-_velocity = min(127, int(velocity * 1.2))  # Boost melody
-            safe_duration = min(duration, 4.0)  # Max 4 beats per note
-            if safe_duration > 0.25:  # Minimum duration
-                midi.addNote(0, 0, pitch, time_pos, safe_duration, final_velocity)
+        # Boost melody, max 4 beats per note
+        add_part(0, 0, generate_melody(params), 1.2, 4.0)
 
     # Track 1: Harmony/Chords (Channel 1)
     harmony_instrument = params['instruments']['harmony']
     if harmony_instrument:
         program_num = INSTRUMENTS.get(harmony_instrument, 48)
-        midi.addProgramChange(1, 1, 0, program_num)
-        logger.info("Harmony track: {} (Program {}, Channel 1)".format(harmony_instrument, program_num))
+        add_program_change(1, 1, program_num)
+        logger.info("Harmony track: %s (Program %s, Channel 1)", harmony_instrument, program_num)
 
-        harmony_data = generate_harmony(params)
-        for pitch, start_beat, duration, velocity in harmony_data:
-            final_velocity = min(127, int(velocity * 0.6))  # Softer harmony
-            safe_duration = min(duration, 4.0)
-            if safe_duration > 0.25:
-                midi.addNote(1, 1, pitch, start_ safe_duration, final_velocity)
+        # Softer harmony
+        add_part(1, 1, generate_harmony(params), 0.6, 4.0)
 
     # Track 2: Bass (Channel 2)
     bass_instrument = params['instruments']['bass']
     if bass_instrument:
         program_num = INSTRUMENTS.get(bass_instrument, 33)
-        midi.addProgramChange(2, 2, 0, program_num)
-        logger.info("Bass track: {} (Program {}, Channel 2)".format(bass_instrument, program_num))
+        add_program_change(2, 2, program_num)
+        logger.info("Bass track: %s (Program %s, Channel 2)", bass_instrument, program_num)
 
-        bass_notes = generate_bass_line(params)
-        for pitch, start_beat, duration, velocity in bass_notes:
-            final_velocity = min(127, int(velocity * 1.1))  # Strong bass
-            safe_duration = min(duration, 2.0)
-            if safe_duration > 0.25:
-                midi.addNote(22, pitch, start_beat, safe_duration, final_velocity)
+        # Strong bass, max 2 beats per note
+        add_part(2, 2, generate_bass_line(params), 1.1, 2.0)
 
-    # Track 3: Drums ( - Standard GM Kit)
+    # Track 3: Drums (Channel 9 - Standard GM Kit)
     if params['drums_enabled']:
-        midi.addProgramChange(3, 9, 0, 0)
+        add_program_change(3, 9, 0)
         logger.info("Drums track: Standard GM Kit (Channel 9)")
 
- Basic 4/4 drum pattern
-        for beat_pos in range(int(duration_beats)):
-            # Kick drum (36) & 3
-            if beat_pos % 4 == 0 or beat_pos % 4 == 2:
-.addNote(3, 9, 36, beat_pos, 0.5, 110)
-            
-            # Snare drum (38) on beats 2 & 4
-            if beat_pos % 4 == 1 or beat_pos % 4 == 3:
-                midi.addNote(3, 9, 38, beat_pos, 0.5, 95)
-            
-            # Hi-hat (42) every beat
-            midi.addNote(3, 9, 42, beat_pos, 0.25, 75)
-
-            # Additional percussion for specific genres
-            if params['genre'] in ['latin', 'dangdut'] and beat_pos % 2 == 0:
-                perc_note = random.choice([43, 45, 49])  # Tom variations
-                midi.addNote(3, 9, perc_note, beat_pos + 0.25, 0.25, 60)
+        # Basic 4/4 drum pattern (pre-built per song length, see drum_groove_events)
+        total_beats = int(duration_beats)
+        tracks[3] += drum_groove_events(total_beats)
+
+        # Additional percussion for specific genres (tom variations sampled in one call)
+        if params['genre'] in ('latin', 'dangdut'):
+            perc_beats = range(0, total_beats, 2)
+            perc_notes = random.choices((43, 45, 49), k=len(perc_beats))
+            for beat_pos, perc_note in zip(perc_beats, perc_notes):
+                add_note(3, 9, perc_note, beat_pos + 0.25, 0.25, 60)
 
     # Write MIDI file
     try:
-        with open(output_path, 'wb') as f:
-            midi.writeFile(f)
-        logger.info("MIDI generated with channel isolation: {}".format(output_path.name))
+        write_midi_tracks(output_path, tracks)
+        logger.info("MIDI generated with channel isolation: %s", output_path.name)
         return True
     except Exception as e:
-        logger.error("Error writing MIDI file: {}".format(e))
+        logger.error("Error writing MIDI file: %s", e)
         return False
 
-def midi_to_audio_subprocess(midi_path, output_wav_path, soundfont_path):
-    """ARM64-optimized FluidSynth subprocess with endian fix"""
-    if not soundfont_path.exists():
-        logger.error("SoundFont not found: {}".format(soundfont_path))
-        return False
+RENDER_SAMPLE_RATE = 44100
+RENDER_BLOCK_FRAMES = 4096
+RENDER_TAIL_SECONDS = 1.0        # Let reverb/release ring out after the last note
+RENDER_MAX_SECONDS = 600         # Safety cap (same role as the subprocess timeout)
 
-    if not midi_path.exists():
-        logger.error("MIDI file not found: {}".format(midi_path))
-        return False
+def load_persistent_synth(soundfont_path):
+    """Create one in-process FluidSynth with the SoundFont preloaded (done once at startup)"""
+    if not FLUIDSYNTH_BINDING_AVAILABLE or not soundfont_path:
+        return None, None
 
     try:
-        # FIXED FluidSynth command for ARM64 (no more endian '0' error)
-        cmd = [
-            'fluidsynth',
-            # Output settings
-            '-F', str(output_wav_path),
-            
-            # ARM64 ENDIAN FIX (CRITICAL)
-            '-o', 'audio.file.endian=little',      # Fix: Set little-endian for ARM64
-            '-o', 'audio.file.format=s16',         # Stable 16-bit format
-            '-o', 'synth.sample-rate=44100',       # Explicit sample rate
-            
-            # Skip audio drivers (file rendering only)
-            '-a', 'null',                          # No real-time audio (avoids ALSA issues)
-            
-            # Basic settings
-            '-ni',                                 # Non-interactive
-            '-g', '0.8',                           # Gain (prevent clipping)
-            
-            # Input files
-            str(soundfont_path),                   # SoundFont
-            str(midi_path)                         # MIDI
-        ]
-
-        logger.info("Rendering MIDI with FluidSynth (ARM64 fixed)...")
-        logger.debug("Command: {}".format(' '.join(cmd)))
-        
-        subprocess
-(
-, 
-_output=True, 
-            text=True, 
-            timeout=60,
-            cwd=AUDIO_OUTPUT_DIR
-        )
+        fs = pyfluidsynth_lib.Synth(gain=0.8, samplerate=float(RENDER_SAMPLE_RATE))
+        # Parallelism comes from the render pool (one synth per worker process)
+        fs.setting('synth.cpu-cores', 1)
+        # Let the MIDI player advance on rendered samples, not wall-clock time,
+        # so get_samples() renders faster than realtime
+        fs.setting('player.timing-source', 'sample')
+
+        sfid = fs.sfload(str(soundfont_path), update_midi_preset=1)
+        if sfid == pyfluidsynth_lib.FLUID_FAILED:
+            logger.error("Failed to load SoundFont with pyfluidsynth")
+            fs.delete()
+            return None, None
 
-        # Check success
-        if result.returncode == 0:
-            if output_wav_path.exists() and output_wav_path.stat().st_size > 1000:
-                file_size = output_wav_path.stat().st_size / 1024
-                logger.info("WAV generated successfully: {} ({:.1f} KB)".format(
-                    output_wav_path.name, file                ))
-                return True
-            else:
-                logger.warning("WAV file too small or empty: {}".format(output_wav_path))
-        
-        # Error logging
-        logger.error("FluidSynth error (code {}):".format(result.returncode))
-        if result.stderr:
-            logger.error("STDERR: {}".format(result.stderr.strip()))
-        if result.stdout:
-            logger.info("STDOUT: {}".format(result.stdout.strip()))
-        
-        # Debug suggestion
-        logger.error("DEBUG: Try manual command:")
-        logger.error("   fluidsynth -F test.wav -o audio.file.endian=little -a null {} {}".format(
-            soundfont_path, midi_path
-        ))
-        
+        logger.info("SoundFont '%s' preloaded in-process (ID: %s)", soundfont_path.name, sfid)
+        return fs, sfid
+
+    except Exception as e:
+        logger.error("pyfluidsynth init error: %s", e)
+        return None, None
+
+# Only render-pool workers hold a synth; the web process just dispatches jobs
+if multiprocessing.parent_process() is not None:
+    SYNTH, SYNTH_SFID = load_persistent_synth(SOUNDFONT_PATH)
+else:
+    SYNTH, SYNTH_SFID = None, None
+SYNTH_LOCK = threading.Lock()    # One render at a time on the shared synth
+
+def render_pcm_blocks(midi_path):
+    """Yield raw s16le stereo PCM blocks rendered by the preloaded in-process synth"""
+    playing = getattr(pyfluidsynth_lib, 'FLUID_PLAYER_PLAYING', 1)
+    max_blocks = int(RENDER_MAX_SECONDS * RENDER_SAMPLE_RATE / RENDER_BLOCK_FRAMES)
+    tail_blocks = int(RENDER_TAIL_SECONDS * RENDER_SAMPLE_RATE / RENDER_BLOCK_FRAMES) + 1
+
+    with SYNTH_LOCK:
+        SYNTH.system_reset()
+        if SYNTH.play_midi_file(str(midi_path)) == pyfluidsynth_lib.FLUID_FAILED:
+            raise RuntimeError("pyfluidsynth failed to load MIDI: {}".format(midi_path))
+
+        try:
+            blocks = 0
+            while (pyfluidsynth_lib.fluid_player_get_status(SYNTH.player) == playing
+                   and blocks < max_blocks):
+                yield SYNTH.get_samples(RENDER_BLOCK_FRAMES).tobytes()
+                blocks += 1
+        finally:
+            SYNTH.play_midi_stop()
+
+        for _ in range(tail_blocks):
+            yield SYNTH.get_samples(RENDER_BLOCK_FRAMES).tobytes()
+
+def ffmpeg_pcm_to_mp3_cmd(output_path):
+    """FFmpeg command that reads raw s16le stereo PCM from stdin and writes MP3"""
+    cmd = [
+        FFMPEG_BIN or 'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 's16le', '-ar', str(RENDER_SAMPLE_RATE), '-ac', '2',
+        '-i', 'pipe:0',
+    ]
+    cmd.extend(MP3_ENCODER_ARGS)
+    cmd.append(str(output_path))
+    return cmd
+
+def midi_to_mp3_pyfluidsynth(midi_path, output_path):
+    """In-process synth -> ffmpeg stdin (no process spawn for synthesis, no WAV on disk)"""
+    ff = subprocess.Popen(ffmpeg_pcm_to_mp3_cmd(output_path),
+                          stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for block in render_pcm_blocks(midi_path):
+            ff.stdin.write(block)
+        ff.stdin.close()
+        _, stderr = ff.communicate(timeout=60)
+    except Exception:
+        ff.kill()
+        ff.wait()
+        raise
+
+    if ff.returncode != 0:
+        logger.error("FFmpeg error (code %s): %s", ff.returncode, stderr.decode(errors='replace').strip())
         return False
+    return True
+
+def midi_to_mp3_subprocess(midi_path, output_path, soundfont_path):
+    """fluidsynth stdout -> ffmpeg stdin pipeline (no WAV on disk)"""
+    fluidsynth_cmd = [
+        'fluidsynth',
+        # Raw PCM to stdout instead of a WAV file
+        '-F', '-',
+        '-T', 'raw',
+
+        # ARM64 ENDIAN FIX (CRITICAL)
+        '-o', 'audio.file.endian=little',      # Fix: Set little-endian for ARM64
+        '-o', 'audio.file.format=s16',         # Stable 16-bit format
+        '-o', 'synth.sample-rate={}'.format(RENDER_SAMPLE_RATE),
+
+        # Skip audio drivers (file rendering only)
+        '-a', 'null',                          # No real-time audio (avoids ALSA issues)
+
+        # Basic settings
+        '-ni',                                 # Non-interactive
+        '-g', '0.8',                           # Gain (prevent clipping)
+
+        # Input files
+        str(soundfont_path),                   # SoundFont
+        str(midi_path)                         # MIDI
+    ]
+
+    logger.info("Rendering MIDI with FluidSynth -> FFmpeg pipe...")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Command: %s", ' '.join(fluidsynth_cmd))
 
+    fs = subprocess.Popen(fluidsynth_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          cwd=AUDIO_OUTPUT_DIR)
+    ff = subprocess.Popen(ffmpeg_pcm_to_mp3_cmd(output_path),
+                          stdin=fs.stdout, stderr=subprocess.PIPE)
+    fs.stdout.close()  # ffmpeg owns the read end; fluidsynth gets SIGPIPE if ffmpeg dies
+    try:
+        _, stderr = ff.communicate(timeout=120)
+        fs.wait(timeout=10)
     except subprocess.TimeoutExpired:
-        logger.error("FluidSynth timeout (60s) - MIDI too complex or large SoundFont")
-        return False
-    except FileNotFoundError:
-        logger.error("'fluidsynth' not found. Install: sudo apt install fluidsynth libsndfile1")
+        fs.kill()
+        ff.kill()
+        fs.wait()
+        ff.wait()
+        raise
+
+    if fs.returncode != 0:
+        logger.error("FluidSynth error (code %s)", fs.returncode)
+        logger.error("DEBUG: Try manual command:")
+        logger.error("   fluidsynth -F - -T raw -o audio.file.endian=little -a null -ni %s %s | "
+                     "ffmpeg -f s16le -ar %s -ac 2 -i pipe:0 test.mp3",
+            soundfont_path, midi_path, RENDER_SAMPLE_RATE
+        )
         return False
-    except Exception as e:
-        logger.error("Unexpected FluidSynth error: {}".format(e))
+    if ff.returncode != 0:
+        logger.error("FFmpeg error (code %s): %s", ff.returncode, stderr.decode(errors='replace').strip())
         return False
+    return True
 
-def midi_to_audio_pyfluidsynth(midi_path, output_wav_path, soundfont_path):
-    """Fallback using pyfluidsynth (less reliable on ARM64)"""
-    if not FLUIDSYNTH_BINDING_AVAILABLE:
-        logger.warning("pyfluidsynth not available, using subprocess")
-        return False
+def midi_to_mp3(midi_path, mp3_path):
+    """Render MIDI straight to MP3; returns MP3 size in bytes (0 on failure)"""
+    if not SOUNDFONT_PATH or not SOUNDFONT_PATH.exists():
+        logger.error("SoundFont not available: %s", SOUNDFONT_PATH)
+        return 0
+
+    if not midi_path.exists():
+        logger.error("MIDI file not found: %s", midi_path)
+        return 0
 
+    # Write to a .part file first so a half-written MP3 is never served
+    part_path = mp3_path.with_name(mp3_path.name + '.part')
     try:
-        fs = pyfluidsynth_lib.Synth()
-        fs.start(driver='alsa')  # Try ALSA first
+        logger.info("Rendering MIDI to MP3: %s -> %s", midi_path.name, mp3_path.name)
 
-        # Load SoundFont
-        sfid = fs.sfload(str(soundfont_path))
-        if sfid == pyfluidsynth_lib.ERROR_CODE:
-            logger.error("Failed to load SoundFont with pyfluidsynth")
-            fs.delete()
-            return False
+        success = False
+        # Primary: persistent in-process synth (SoundFont already loaded)
+        if SYNTH is not None:
+            try:
+                success = midi_to_mp3_pyfluidsynth(midi_path, part_path)
+            except Exception as e:
+                logger.error("pyfluidsynth render error: %s", e)
 
-        logger.info("SoundFont '{}' loaded with pyfluidsynth (ID: {})".format(
-            soundfont_path.name, sfid
-        ))
-        
-        # Note: pyfluidsynth has limited MIDI file support
-        # Better to use subprocess for full compatibility
-        fs.delete()
-        logger.warning("pyfluidsynth limited for MIDI rendering. Using subprocess instead.")
-        return False
+        # Fallback: fluidsynth subprocess (binding missing or render failed)
+        if not success:
+            success = midi_to_mp3_subprocess(midi_path, part_path, SOUNDFONT_PATH)
 
-    except Exception as e:
-        logger.error("pyfluidsynth error: {}".format(e))
-        return False
+        # One stat (EAFP) gives both the sanity check and the size for the response
+        try:
+            file_size = part_path.stat().st_size if success else 0
+        except FileNotFoundError:
+            file_size = 0
 
-def midi_to_audio(midi_path, output_wav_path):
-    """Main MIDI to audio conversion"""
-    if not SOUNDF or not SOUNDFONT_PATH logger.error("SoundFont not available: {}".format(SOUNDFONT_PATH))
-        return False
-    
-    # Primary: subprocess (most reliable)
-    success = midi_to_audio_subprocess(midi_path, output_wav_path, SOUNDFONT_PATH)
-    
-    # Fallback: pyfluidsynth (if available)
-    if not success and FLUIDSYNTH_BINDING_AVAILABLE:
-        logger.info("Falling back to pyfluidsynth...")
-        success = midi_to_audio_pyfluidsynth(midi_path, output_wav_path, SOUNDFONT_PATH)
-    
-    return success
+        if file_size > 1000:
+            os.replace(part_path, mp3_path)  # Atomic rename
+            logger.info("MP3 generated: %s (%.1f KB)", mp3_path.name, file_size / 1024)
+            return file_size
 
-def wav_to_mp3(wav_path, mp3_path):
-    """Convert WAV to MP3 with audio processing"""
-    if not wav_path.exists() or wav_path.stat().st_size == 0:
-        logger.error("Empty WAV file: {}".format(wav_path))
-        return False
+        logger.warning("MP3 file missing or too small: %s", mp3_path)
+        part_path.unlink(missing_ok=True)
+        return 0
 
+    except subprocess.TimeoutExpired:
+        logger.error("Render timeout - MIDI too complex or large SoundFont")
+        part_path.unlink(missing_ok=True)
+        return 0
+    except FileNotFoundError as e:
+        logger.error("Binary not found (%s). Install: sudo apt install fluidsynth ffmpeg", e)
+        part_path.unlink(missing_ok=True)
+        return 0
+    except Exception as e:
+        logger.error("MIDI to MP3 error: %s", e)
+        part_path.unlink(missing_ok=True)
+        if FFMPEG_BIN is None:
+            logger.error("Install FFmpeg: sudo apt install ffmpeg")
+        return 0
+
+# Render pool: MIDI build + FluidSynth/FFmpeg run in worker processes so the
+# request handler only awaits the result. 'spawn' gives every worker its own
+# freshly loaded synth instead of a forked copy of the parent's.
+RENDER_WORKERS = os.cpu_count() or 1
+RENDER_PREWARM_TIMEOUT = 60  # Seconds to wait for workers to load the SoundFont at startup
+RENDER_POOL = ProcessPoolExecutor(
+    max_workers=RENDER_WORKERS,
+    mp_context=multiprocessing.get_context('spawn')
+)
+
+atexit.register(RENDER_POOL.shutdown, wait=False, cancel_futures=True)
+
+def warm_render_worker():
+    """No-op pool job; importing the module in the worker already preloaded the SoundFont"""
+    return SYNTH is not None
+
+def prewarm_render_pool(timeout=RENDER_PREWARM_TIMEOUT):
+    """Start every render worker now so the first requests don't pay SoundFont load time"""
+    futures = [RENDER_POOL.submit(warm_render_worker) for _ in range(RENDER_WORKERS)]
+    done, pending = wait(futures, timeout=timeout)
+    if pending:
+        logger.warning("%d render workers still starting after %ss", len(pending), timeout)
+    ready = sum(1 for future in done if future.exception() is None and future.result())
+    logger.info("Render pool ready: %s/%s workers with preloaded SoundFont", ready, RENDER_WORKERS)
+    if ready < RENDER_WORKERS:
+        # Without the binding every render spawns the fluidsynth CLI, which re-parses the SoundFont
+        logger.warning("pyfluidsynth unavailable in %s worker(s); falling back to the fluidsynth CLI per request. "
+                       "Install it with: pip install pyfluidsynth", RENDER_WORKERS - ready)
+
+def render_song(params, midi_path, mp3_path):
+    """Worker job: create the MIDI file and render it to MP3 (returns (error message, MP3 bytes))"""
     try:
-        logger.info("Converting WAV to MP3: {} -> {}".format(wav_path.name, mp3_path.name))
-        
-        # Load WAV
-        audio = AudioSegment.from_wav(wav_path)
-        
-        # Audio enhancement filters
-        audio_filters = [
-            "compand=attacks=0.3:decays=1:points=-80/-90|-40/-40|-20/-20|0/-10",
-            "bass=g=6:f=100:w=0.5",
-            "loudnorm=I=-16:TP=-1.5:LRA=11 ]
-        
-        ffmpeg_filters = "|".join(audio_filters)
-        
-        # Export to MP3
-        audio.export(
-            mp3_path,
-            format='mp3',
-            bitrate='192k',
-            parameters=[
-                '- ffmpeg_filters,
-                '-ar', '44100',  # Sample rate
-                '-ac', '2',      # Stereo
-            ]
-        )
-        
-        if mp3_path.exists() and mp3_path.stat().st_size > 1000:
-            file_size = mp3_path.stat().st_size / 1024
-            logger.info("MP3 generated: {} ({:.1f} KB)".format(mp3_path.name, file_size))
+        logger.info("1. Generating MIDI file...")
+        if not create_midi_file(params, midi_path):
+            return 'Failed to create MIDI file. Check logs.', 0
+
+        # Render MIDI and encode MP3 in one pipe (FluidSynth -> FFmpeg, no WAV)
+        logger.info("2. Rendering MIDI to MP3 (FluidSynth -> FFmpeg)...")
+        mp3_bytes = midi_to_mp3(midi_path, mp3_path)
+        if not mp3_bytes:
+            return 'Failed to render MIDI to MP3. Install FluidSynth + FFmpeg: sudo apt install fluidsynth ffmpeg', 0
+        return None, mp3_bytes
+    finally:
+        midi_path.unlink(missing_ok=True)
+
+# Content-addressed audio cache: same (lyrics, genre, tempo) -> same MP3 file.
+# Hit counts + response metadata live in a small JSON sidecar next to the MP3s.
+# Hits are counted in memory and flushed by the periodic cleanup (and at exit).
+AUDIO_CACHE_MAX_MB = 512
+AUDIO_CACHE_INDEX_PATH = AUDIO_OUTPUT_DIR / 'cache_index.json'
+AUDIO_CACHE_LOCK = threading.Lock()
+
+def load_audio_cache_index():
+    """Load the cache sidecar (empty index if missing or unreadable)"""
+    try:
+        with open(AUDIO_CACHE_INDEX_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+AUDIO_CACHE_INDEX = load_audio_cache_index()
+AUDIO_CACHE_DIRTY = False  # Hit counts changed since the last save
+
+def save_audio_cache_index():
+    """Persist the cache sidecar atomically (caller holds AUDIO_CACHE_LOCK)"""
+    global AUDIO_CACHE_DIRTY
+    part_path = AUDIO_CACHE_INDEX_PATH.with_name(AUDIO_CACHE_INDEX_PATH.name + '.part')
+    with open(part_path, 'w', encoding='utf-8') as f:
+        json.dump(AUDIO_CACHE_INDEX, f)
+    os.replace(part_path, AUDIO_CACHE_INDEX_PATH)
+    AUDIO_CACHE_DIRTY = False
+
+def flush_audio_cache_index():
+    """Write the sidecar if in-memory hit counts changed since the last save"""
+    with AUDIO_CACHE_LOCK:
+        if not AUDIO_CACHE_DIRTY:
+            return
+        try:
+            save_audio_cache_index()
+        except OSError as e:
+            logger.warning("Could not save audio cache index: %s", e)
+
+atexit.register(flush_audio_cache_index)
+
+def cache_key(lyrics_bytes, genre, tempo):
+    """Stable content hash for a generation request (lyrics already UTF-8 encoded)"""
+    digest = hashlib.blake2b("{}|{}|".format(genre, tempo).encode('utf-8'), digest_size=16)
+    digest.update(lyrics_bytes)
+    return digest.hexdigest()
+
+def get_cached_audio(key):
+    """Return cached response metadata (and count the hit in memory), or None on a miss"""
+    global AUDIO_CACHE_DIRTY
+    if key not in AUDIO_CACHE_INDEX or not (AUDIO_OUTPUT_DIR / "{}.mp3".format(key)).exists():
+        return None
+    with AUDIO_CACHE_LOCK:
+        entry = AUDIO_CACHE_INDEX.get(key)
+        if entry is None:
+            return None
+        entry['hits'] = entry.get('hits', 0) + 1
+        AUDIO_CACHE_DIRTY = True
+        return dict(entry)
+
+def store_cached_audio(key, metadata):
+    """Register a freshly rendered MP3 in the cache index"""
+    with AUDIO_CACHE_LOCK:
+        AUDIO_CACHE_INDEX[key] = dict(metadata, hits=0)
+        save_audio_cache_index()
+
+def audio_payload(audio_key, metadata, cached):
+    """JSON body for a finished generation (fresh or from cache)"""
+    mp3_filename = "{}.mp3".format(audio_key)
+    return {
+        'success': True,
+        'status': 'done',
+        'cached': cached,
+        'filename': mp3_filename,
+        'audio_url': '/static/audio_output/{}'.format(mp3_filename),
+        'download_url': request.url_root + 'static/audio_output/{}'.format(mp3_filename),
+        'genre': metadata['genre'],
+        'tempo': metadata['tempo'],
+        'duration': metadata['duration'],
+        'id': audio_key,
+        'size': metadata['size'],
+        'soundfont': SOUNDFONT_PATH.name if SOUNDFONT_PATH else 'None'
+    }
+
+def audio_response(audio_key, metadata, cached):
+    """Finished generation: the MP3 itself if the client asked for audio/mpeg, else JSON
+
+    Sending the audio in the same response saves the player a second round-trip;
+    the JSON metadata then travels in the X-Generation-Meta header.
+    """
+    payload = audio_payload(audio_key, metadata, cached)
+    if request.accept_mimetypes.best != 'audio/mpeg':
+        return jsonify(payload)
+
+    response = send_from_directory(AUDIO_OUTPUT_DIR, payload['filename'],
+                                   mimetype='audio/mpeg', conditional=True)
+    response.headers['X-Generation-Meta'] = json.dumps(payload)
+    response.headers['Access-Control-Expose-Headers'] = 'X-Generation-Meta'
+    response.headers['Vary'] = 'Accept'
+    return response
+
+# Render jobs in flight: audio_key -> Future. Finished jobs are dropped in their
+# done callback: successes are answered from the cache index, failures from a
+# small bounded map (audio_key -> error message) until their status is read.
+RENDER_JOBS = {}
+RENDER_JOBS_LOCK = threading.Lock()
+MAX_PENDING_JOBS = RENDER_WORKERS * 4
+FAILED_RENDERS = OrderedDict()
+MAX_FAILED_RENDERS = 256
+
+def render_job_error(future):
+    """Error message of a finished render job, or None if it succeeded"""
+    error = future.exception()
+    return str(error) if error else future.result()[0]
+
+def submit_render_job(audio_key, genre, params, midi_path, mp3_path):
+    """Queue a render on the pool (deduplicated by audio key); False if the queue is full"""
+    with RENDER_JOBS_LOCK:
+        existing = RENDER_JOBS.get(audio_key)
+        # Attach to a running (or just succeeded) job; a failed one is replaced by a fresh render
+        if existing is not None and not (existing.done() and render_job_error(existing)):
             return True
-        else:
-            logger.warning("MP3 file too small: {}".format(mp3_path))
+        pending = sum(1 for job in RENDER_JOBS.values() if not job.done())
+        if pending >= MAX_PENDING_JOBS:
             return False
+        FAILED_RENDERS.pop(audio_key, None)
+        future = RENDER_POOL.submit(render_song, params, midi_path, mp3_path)
+        RENDER_JOBS[audio_key] = future
+
+    def finish(error_message=None):
+        with RENDER_JOBS_LOCK:
+            if RENDER_JOBS.get(audio_key) is future:
+                del RENDER_JOBS[audio_key]
+                if error_message:
+                    FAILED_RENDERS[audio_key] = error_message
+                    while len(FAILED_RENDERS) > MAX_FAILED_RENDERS:
+                        FAILED_RENDERS.popitem(last=False)
+
+    def on_done(done_future):
+        try:
+            render_error, mp3_bytes = done_future.result()
+        except Exception as e:
+            logger.error("Render job %s crashed: %s", audio_key, e)
+            return finish(str(e))
+        if render_error:
+            logger.error("Render job %s failed: %s", audio_key, render_error)
+            return finish(render_error)
 
-    as e:
-        logger.error("WAV to MP3 conversion error: {}".format(e))
-        if shutil.which('ffmpeg') is None:
-            logger.error("Install FFmpeg: sudo apt install ffmpeg")
-        return False
+        # Duration is exact from the score; no need to decode the MP3 again
+        duration_seconds = params['duration_beats'] * 60 / params['tempo']
+        logger.info("Generation complete! ID: %s (%.1f KB)", audio_key, mp3_bytes / 1024)
+        store_cached_audio(audio_key, {
+            'genre': genre,
+            'tempo': params['tempo'],
+            'duration': round(duration_seconds, 1),
+            'size': round(mp3_bytes / 1024),
+        })
+        finish()
+
+    future.add_done_callback(on_done)
+    return True
+
+def evict_audio_cache(directory, max_mb=AUDIO_CACHE_MAX_MB):
+    """LFU eviction: delete least-used cached MP3s until the directory fits the size budget"""
+    entries = []
+    total_bytes = 0
+    # One directory fd: stat/unlink resolve names relative to it (fstatat/unlinkat)
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        with os.scandir(dir_fd) as it:
+            for entry in it:
+                if not entry.name.endswith('.mp3'):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                total_bytes += st.st_size
+                entries.append((entry.name, st))
+
+        budget = max_mb * 1024 * 1024
+        if total_bytes <= budget:
+            return 0
+
+        evicted = 0
+        with AUDIO_CACHE_LOCK:
+            # Fewest hits first, oldest first among equals
+            entries.sort(key=lambda e: (AUDIO_CACHE_INDEX.get(e[0][:-4], {}).get('hits', 0), e[1].st_mtime))
+            for name, st in entries:
+                if total_bytes <= budget:
+                    break
+                try:
+                    os.unlink(name, dir_fd=dir_fd)
+                except OSError as e:
+                    logger.warning("Error evicting %s: %s", name, e)
+                    continue
+                AUDIO_CACHE_INDEX.pop(name[:-4], None)
+                total_bytes -= st.st_size
+                evicted += 1
+            save_audio_cache_index()
+    finally:
+        os.close(dir_fd)
+
+    logger.info("Audio cache eviction: %d files removed (LFU)", evicted)
+    return evicted
+
+CLEANUP_SUFFIXES = frozenset(['mp3', 'wav', 'mid', 'part'])
+CLEANUP_INTERVAL_SECONDS = 15 * 60
 
 def cleanup_old_files(directory, max_age_hours=1):
     """Clean up old generated files"""
-    logger.info("Cleaning old files in {} (older than {}h)".format(directory, max_age_hours))
+    logger.info("Cleaning old files in %s (older than %sh)", directory, max_age_hours)
     deleted_count = 0
 
-    cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+    cutoff_ts = time.time() - max_age_hours * 3600
 
-    for file_path in Path(directory).glob("*.{mp3,wav,mid}"):
-        try:
-            file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-            if file_time < cutoff_time:
-                file()
-                logger.debug("Deleted: {}".format(file_path.name))
-                deleted_count += 1
-        except Exception as e:
-            logger.warning("Error deleting {}: {}".format(file_path.name, e))
-
-    logger.info("Cleanup complete: {} files deleted".format(deleted_count))
+    # One directory fd: stat/unlink resolve names relative to it (fstatat/unlinkat)
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        with os.scandir(dir_fd) as entries:
+            for entry in entries:
+                if entry.name.rpartition('.')[2] not in CLEANUP_SUFFIXES:
+                    continue
+                # Cached MP3s are left to the LFU eviction below
+                if entry.name[:-4] in AUDIO_CACHE_INDEX and entry.name.endswith('.mp3'):
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff_ts:
+                        os.unlink(entry.name, dir_fd=dir_fd)
+                        deleted_count += 1
+                except OSError as e:
+                    logger.warning("Error deleting %s: %s", entry.name, e)
+    finally:
+        os.close(dir_fd)
+
+    # Cached MP3s are evicted by use frequency once the size budget is exceeded
+    deleted_count += evict_audio_cache(directory)
+    flush_audio_cache_index()
+
+    logger.info("Cleanup complete: %d files deleted", deleted_count)
     return deleted_count
 
-def generate_unique_id(lyrics):
-    """Generate unique    hash.md5(lyrics.encode('utf-8')).hexdigest()
-    timestamp = str(int(time.time()))
-    return "{}_{}".format(hash_object[:8], timestamp)
+def schedule_cleanup(directory, interval_seconds=CLEANUP_INTERVAL_SECONDS):
+    """Run cleanup_old_files periodically on a background timer thread (off the request path)"""
+    def run():
+        try:
+            cleanup_old_files(directory)
+        except Exception as e:
+            logger.error("Background cleanup failed: %s", e)
+        schedule_cleanup(directory, interval_seconds)
+
+    timer = threading.Timer(interval_seconds, run)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+if multiprocessing.parent_process() is None:
+    schedule_cleanup(AUDIO_OUTPUT_DIR)
+
+# Page assets are minified once at startup (source -> .min), then pre-compressed
+# (.min -> .min.gz) so nginx can serve them directly with `gzip_static on;`.
+# Build outputs, not sources: ignored via .gitignore. The stylesheet comes first
+# so the page only links app.min.css once it has actually been written.
+MINIFIED_ASSETS = (('app.css', 'app.min.css'), ('index.html', 'index.min.html'))
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.S)
+STYLE_BLOCK_PATTERN = re.compile(r'(<style\b[^>]*>)(.*?)(</style>)', re.S | re.I)
+
+def minify_markup(text, is_css=False):
+    """Conservative minifier: drop indentation, blank lines and comments (textarea/pre bodies kept)
+
+    /* */ comments are only stripped from CSS (stylesheets and <style> bodies);
+    inline scripts may legitimately contain them in strings, e.g. '*/*'.
+    """
+    if is_css:
+        text = CSS_COMMENT_PATTERN.sub('', text)
+    else:
+        text = re.sub(r'<!--.*?-->', '', text, flags=re.S)
+        text = STYLE_BLOCK_PATTERN.sub(
+            lambda m: m.group(1) + CSS_COMMENT_PATTERN.sub('', m.group(2)) + m.group(3), text)
+    lines = []
+    preserve = False
+    for line in text.splitlines():
+        lower = line.lower()
+        if preserve:
+            lines.append(line)
+        elif line.strip():
+            lines.append(line.strip())
+        if '<textarea' in lower or '<pre' in lower:
+            preserve = True
+        if '</textarea>' in lower or '</pre>' in lower:
+            preserve = False
+    return '\n'.join(lines)
+
+def build_static_assets():
+    """Write minified + gzip -9 copies of the page assets if missing or older than the source"""
+    for name, min_name in MINIFIED_ASSETS:
+        source = STATIC_DIR / name
+        minified = STATIC_DIR / min_name
+        compressed = STATIC_DIR / (min_name + '.gz')
+        try:
+            source_mtime = source.stat().st_mtime
+            if all(out.exists() and out.stat().st_mtime >= source_mtime for out in (minified, compressed)):
+                continue
+            text = minify_markup(source.read_text(encoding='utf-8'), is_css=name.endswith('.css'))
+            for original, replacement in MINIFIED_ASSETS:
+                if (STATIC_DIR / replacement).exists():
+                    text = text.replace('/static/' + original, '/static/' + replacement)
+            minified.write_text(text, encoding='utf-8')
+            compressed.write_bytes(gzip.compress(text.encode('utf-8'), compresslevel=9))
+        except OSError as e:
+            logger.warning("Could not build %s: %s", min_name, e)
+
+if multiprocessing.parent_process() is None:
+    build_static_assets()
 
 @app.route('/')
 def index():
     """Main web interface"""
-    html_template = """
-<!DOCTYPE html>
-<html lang="id">
-<head>
-    <meta charset="UTF-8">
-meta name="viewport="width=device-width, initial-scale=1.0">
-    <title>🎵 Flask Generate Instrumental AI 🎵</title>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2             min-height: 100vh;
-            padding: 20px;
-            color: #333;
-        }
-        .container { max-width: 800px; margin: auto; }
-        h1 { text-align: center; 
-            color: white; 
-            margin-bottom: 30px; 
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.            font-size: 2.5em;
-        }
-        .card {
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0  30px rgba(0,0,0,0.2);
-            margin-bottom: 20px;
-        }
-        label { 
-            display: 
-            margin-bottom: 8px; 
-            font-weight: bold; 
-            color: #2c3e50;
-            font-size:         textarea:focus { border-color: #3498db; outline: none; }
-        select, input[type="number"] {
-            width: 100%;
-            padding: ;
-            margin-bottom: 20px;
-            border: 2px solid #ddd;
-            border-radius: 10px;
-            font-size: 16px;
-            background: #f8f9fa;
-        }
-        input[type="number"] { width: 200px; display: inline-block; margin-right: 10px; }
-        .form-row { display: flex; gap: 15px; align-items; }
-        .form-row label { margin-bottom: 0; }
-        button {
-            background: linear-gradient(45deg, #3498db, #2980b9);
-            color: white;
-            padding: 15px 30px;
-            border: none;
-            border-radius: 10px;
-            cursor: pointer;
-            font-size: 18px;
-            font-weight;
-            width: 100%;
-            transition: transform 0.2s, box-shadow 0.2s;
-        }
-        button:hover { 
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(52, 152, 219, 0.4);
-        }
-        button:active { transform: translateY(0); }
-        .result {
-            margin-top: 30px;
-            padding: 25px;
-            background: linear-gradient(135deg, #e8f6f3, #d1ecea);
-            border-radius: 15px;
-            border-left: 5px solid #27ae60;
-            display: none;
-        }
-        .result.show { display: block; animation: fadeIn 0.5s; }
-        @keyframes fadeIn { from { opacity: 0; transform: translateY(20px); } to { opacity: 1; transform: translateY(0); } }
-        .success { color: #27ae60; font-weight: bold; }
-        .error { color: #e74c3c; font-weight: bold; }
-        .info { color: #3498db; }
-        audio { 
-            width: 100%; 
-            margin: 20px 0; 
-            border-radius: 10px;
-            background: white;
-            padding: 10px;
-        }
-        .download-btn {
-            display: inline-block;
-            background: #27ae60;
-            color: white;
-            padding: 10px 20px;
-            text-decoration: none;
-            border-radius: 8px;
-            margin: 10px 5px;
-            transition: background 0.3s;
-        }
-        .download-btn:hover { background: #229954; }
-        .loading {
-            text-align: center;
-            padding: 20px;
-            color: #7f8c8d;
-        }
-        .spinner {
-            border: 4px solid #f3f3f3;
-            border-top: 4px solid #3498db;
-            border-radius: 50%;
-            width: 40px;
-            height: 40px;
-            animation: spin 1s linear infinite;
-            margin: 0 auto 20px;
-        }
-        @keyframes spin { 0% { transform: rotate(0deg); } 100% { transform: rotate(360deg); } }
-        .status { font-style: italic; color: #7f8c8d; margin: 10px 0; }
-        small { color: #95a5a6; font-size: 0.9em; }
-        @media (max-width: 600px) {
-            .container { padding: 10px; }
-            h1 { font-size: 2em; }
-            .card { padding: 20px; }
-            .form-row { flex-direction: column; align-items: stretch; }
-            input[type="number"] { width: 100%; margin-right: 0; margin-bottom: 10px; }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🎵 Generate Instrumental AI 🎵</h1>
-        <p style="text-align: center; color: white; margin-bottom: 30px;">
-            Masukkan lirik Anda dan AI akan generate instrumental musik otomatis! 
-            Support Pop, Rock, Metal, Jazz, Latin, Dang Dangdut, dan lainnya.
-        </p>
-
-        <div class="card">
-            <form id="musicForm">
-                <label for="lyrics">📝 Lirik Lagu:</label>
-                <textarea 
-                    id="lyrics" 
-                    name="lyrics" 
-                    placeholder="Masukkan lirik lagu Anda di sini...
-
-Contoh:
-[Verse 1]
-Di malam yang sunyi kukenang dirimu
-Bayangmu hadir dalam mimpiku malam ini
-
-[Chorus]  
-Cinta ini takkan pernah usai
-Selamanya kau di hatiku..." 
-                    required
-                ></textarea>
-
-                <div class="form-row">
-                    <div style="flex: 1;">
-                        <label for="genre">🎸 Genre Musik:</label>
-                        <select id="genre" name="genre">
-                            <option value="auto">🤖 Auto-Detect dari Lirik</option>
-                            <option value="pop">🎤 Pop</option>
-                            <option value="rock">🎸 Rock</option>
-                            <option value="metal">🤘 Metal</option>
-                            <option value="ballad">💔 Ballad</option>
-                            <option value="blues">🎷 Blues</option>
-                            <option value="jazz">🎹 Jazz</option>
-                            <option value="hiphop">🎧 Hip-Hop</option>
-                            <option value="latin">💃 Latin</option>
-                            <option value="dangdut">🎶 Dangdut</option>
-                        </select>
-                    </div>
-                    <div style="flex: 1;">
-                        <label for="tempo">🥁 Tempo (BPM):</label>
-                        <input type="number" id="tempo" name="tempo" min="60" max="200" placeholder="Auto">
-                        <small>(Kosongkan untuk auto-detect berdasarkan genre)</small>
-                    </div>
-                </div>
-
-                <button type="submit">🚀 Generate Instrumental Sekarang!</button>
-            </form>
-        </div>
-
-        <div id="result" class="result">
-            <h3>🎉 Hasil Generasi Musik:</h3>
-            <div id="status" class="status"></div>
-            <div id="loading" class="loading" style="display: none;">
-                <div class="spinner"></div>
-                <p>🎵 AI sedang mengkomposisi musik Anda... Ini butuh 30-60 detik</p>
-                <p>Proses: Analisis lirik → Generate melody → Harmony → Mixing</p>
-            </div>
-            <audio id="audioPlayer" controls style="display: none;"></audio>
-            <div id="downloadLinks"></div>
-            <div id="info"></div>
-        </div>
-    </div>
-
-    <script>
-        document.getElementById('musicForm').addEventListener('submit', async function(e) {
-            e.preventDefault();
-
-            // Get form data
-            const formData = new FormData();
-            formData.append('lyrics', document.getElementById('lyrics').value.trim());
-            formData.append('genre', document.getElementById('genre').value);
-            
-            const tempoValue = document.getElementById('tempo').value;
-            formData.append('tempo', tempoValue === '' ? 'auto' : tempoValue);
-
-            // UI elements
-            const resultDiv = document.getElementById('result');
-            const statusDiv = document.getElementById('status');
-            const loadingDiv = document.getElementById('loading');
-            const audioPlayer = document.getElementById('audioPlayer');
-            const downloadLinks = document.getElementById('downloadLinks');
-            const infoDiv = document.getElementById('info');
-
-            resultDiv.classList.add('show');
-            statusDiv.innerHTML = '';
-            loadingDiv.style.display = 'block';
-            audioPlayer.style.display = 'none';
-            downloadLinks.innerHTML = '';
-            infoDiv.innerHTML = '';
-
-            try {
-                statusDiv.innerHTML = '<p class="success">🚀 Memulai generasi instrumental...</p>';
-                
-                const response = await fetch('/generate-instrumental', {
-                    method: 'POST',
-                    body: formData
-                });
-
-                loadingDiv.style.display = 'none';
-
-                if (response.ok) {
-                    const data = await response.json();
-                    
-                    if (data.success) {
-                        statusDiv.innerHTML = `
-                            <p class="success">🎉 Instrumental berhasil digenerate!</p>
-                            <p><strong>Genre:</strong> <span class="info">${data.genre}</span></p>
-                            <p><strong>Tempo:</strong> <span class="info">${data.tempo} BPM</span></p>
-                            <p><strong>Durasi:</strong> <span class="info">${data.duration} detik</span></p>
-                            <p><strong>ID:</strong> <span class="info">${data.id}</span></p>
-                        `;
-
-                        // Audio player
-                        audioPlayer.src = `/static/audio_output/${data.filename}`;
-                        audioPlayer.style.display = 'block';
-                        audioPlayer.load();
-                        
-                        // Auto-play with fallback
-                        setTimeout(() => {
-                            audioPlayer.play().catch(e => {
-                                console.log('Autoplay blocked:', e);
-                            });
-                        }, 500);
-
-                        // Download
-                        downloadLinks.innerHTML = `
-                            <a href="/static/audio_output/${data.filename}" class="download-btn" download>
-                                💾 Download MP3 (${Math.round(data.size || 0)} KB)
-                            </a>
-                            <br><small>Share hasil Anda di media sosial! 🎵</small>
-                        `;
-
-                        // Technical info
-                        infoDiv.innerHTML = `
-                            <p style="font-size: 0.9em; color: #7f8c8d; margin-top: 20px;">
-                                <strong>🔧 Technical Info:</strong> Generated dengan channel isolation 
-                                (Melody/Harmony/Bass/Drums terpisah) menggunakan FluidSynth + 
-                                General MIDI SoundFont. Proyek open-source.
-                            </p>
-                        `;
-                    } else {
-                        throw new Error(data.error || 'Unknown error');
-                    }
-                } else {
-                    const errorData = await response.json();
-                    statusDiv.innerHTML = `<p class="error">❌ Error: ${errorData.error || 'Gagal generate instrumental'}</p>`;
-                    
-                    if (errorData.error && errorData.error.includes('FluidSynth')) {
-                        statusDiv.innerHTML += `
-                            <p style="font-size: 0.9em; color: #e67e22;">
-                                💡 Tips: Install FluidSynth dengan: <code>sudo apt install fluidsynth libsndfile1</code>
-                            </p>
-                        `;
-                    }
-                }
-            } catch (error) {
-                loadingDiv.style.display = 'none';
-                statusDiv.innerHTML = `
-                    <p class="error">🌐 Network Error: ${error.message}</p>
-                    <p style="font-size: 0.9em; color: #7f8c8d;">
-                        Pastikan server berjalan di http://127.0.0.1:5000 dan koneksi stabil.
-                        Coba refresh halaman atau restart server.
-                    </p>
-                `;
-                console.error('Generate error:', error);
-            }
-        });
-
-        // Auto-resize textarea
-        document.getElementById('lyrics').addEventListener('input', function() {
-            this.style.height = 'auto';
-            this.style.height = Math.min(this.scrollHeight, 300) + 'px';
-        });
-    </script>
-</body>
-</html>
-"""
-    return render_template_string(html_template)
+    # Static file: Werkzeug handles ETag/If-Modified-Since (304s) and sendfile.
+    # The source page is the fallback when the startup build could not write
+    # the minified copy (e.g. read-only static/).
+    name = 'index.min.html' if (STATIC_DIR / 'index.min.html').is_file() else 'index.html'
+    return send_from_directory(STATIC_DIR, name, conditional=True, max_age=3600)
+
+@app.errorhandler(413)
+def request_too_large(error):
+    """Body above MAX_CONTENT_LENGTH: JSON error for the frontend instead of the HTML page"""
+    return jsonify({'error': 'Request terlalu besar (maksimal 64 KB).'}), 413
 
 @app.route('/generate-instrumental', methods=['OPTIONS', 'POST'])
 def generate_instrumental_endpoint():
@@ -1124,126 +1429,128 @@ def generate_instrumental_endpoint():
 
         if not lyrics or len(lyrics) < 10:
             return jsonify({'error': 'Lirik minimal 10 karakter. Masukkan lirik lengkap.'}), 400
+        lyrics_bytes = lyrics.encode('utf-8')  # Encoded once: size limit (bytes) + cache key
+        if len(lyrics_bytes) > MAX_LYRICS_LENGTH:
+            return jsonify({'error': 'Lirik terlalu panjang (maksimal 16 KB).'}), 413
 
-        logger.info("Processing lyrics: '{}' ({})".format(lyrics[:100], len(lyrics)))
-        logger.info("Input: Genre='{}', Tempo='{}'".format(genre_input, tempo_input))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Processing lyrics: '%s' (%d)", lyrics[:100], len(lyrics))
+        logger.info("Input: Genre='%s', Tempo='%s'", genre_input, tempo_input)
 
-        # Detect genre and generate parameters
-        genre = genre_input if genre_input != 'auto' else detect_genre_from_lyrics(lyrics)
-        params = get_music_params_from_lyrics(genre, lyrics, tempo_input)
-
-        # Generate unique filenames
-        unique_id = generate_unique_id(lyrics)
-        midi_filename = "{}.mid".format(unique_id)
-        wav_filename = "{}.wav".format(unique_id)
-        mp3_filename = "{}.mp3".format(unique_id)
+        # Step 0: Serve identical requests straight from the audio cache
+        audio_key = cache_key(lyrics_bytes, genre_input, tempo_input)
+        cached = get_cached_audio(audio_key)
+        if cached is not None:
+            logger.info("Cache hit: %s (hits: %s)", audio_key, cached['hits'])
+            return audio_response(audio_key, cached, cached=True)
 
-        paths = {
-            'midi': AUDIO_OUTPUT_DIR / midi_filename,
-            'wav': AUDIO_OUTPUT_DIR / wav_filename,
-            'mp3': AUDIO_OUTPUT_DIR / mp3_filename
-        }
-
-        logger.info("Starting generation for ID: {}".format(unique_id))
-
-        # Step 1: Create MIDI file
-        logger.info("1. Generating MIDI file...")
-        if not create_midi_file(params, paths['midi']):
-            return jsonify({'error': 'Failed to create MIDI file. Check logs.'}), 500
-
-        # Step 2: Render to WAV with FluidSynth
-        logger.info("2. Rendering MIDI to audio (FluidSynth)...")
         if not SOUNDFONT_PATH or not SOUNDFONT_PATH.exists():
-            paths['midi'].unlink(missing_ok=True)
             return jsonify({
                 'error': "SoundFont not found: {}. Download from https://musical-artifacts.com/artifacts/661".format(SOUNDFONT_PATH)
             }), 500
 
-        if not midi_to_audio(paths['midi'], paths['wav']):
-            paths['midi'].unlink(missing_ok=True)
-            return jsonify({
-                'error': 'Failed to render MIDI to audio. Install FluidSynth: sudo apt install fluidsynth libsndfile1'
-            }), 500
-
-        # Step 3: Convert to MP3
-        logger.info("3. Converting to MP3 format...")
-        if not wav_to_mp3(paths['wav'], paths['mp3']):
-            # Cleanup partial files
-            for path in [paths['midi'], paths['wav']]:
-                if path.exists():
-                    path.unlink()
-            return jsonify({'error': 'Failed to convert to MP3. Install FFmpeg: sudo apt install ffmpeg'}), 500
-
-        # Step 4: Calculate duration
-        duration_seconds = params['duration_beats'] * 60 / params['tempo']
-        try:
-            if paths['mp3'].exists():
-                audio = AudioSegment.from_mp3(paths['mp3'])
-                duration_seconds = len(audio) / 1000.0
-        except Exception as e:
-            logger.warning("Failed to get MP3 duration: {}".format(e))
-
-        # Step 5: Cleanup temporary files
-        for temp_path in [paths['midi'], paths['wav']]:
-            if temp_path.exists():
-                temp_path.unlink()
-        logger.info("Temporary files cleaned up")
+        # Detect genre and generate parameters
+        if genre_input == 'auto':
+            genre = detect_genre_from_lyrics(lyrics)
+            logger.info("Genre detected from keywords: '%s'", genre)
+        else:
+            genre = genre_input
+        params = get_music_params_from_lyrics(genre, lyrics, tempo_input)
 
-        # File size
-        mp3_size_kb = paths['mp3'].stat().st_size / 1024 if paths['mp3'].exists() else 0
+        # Temp MIDI and MP3 are both named after the audio key: RENDER_JOBS runs
+        # one render per key, and requests differing in genre or tempo never share a file
+        paths = {
+            'midi': AUDIO_OUTPUT_DIR / "{}.mid".format(audio_key),
+            'mp3': AUDIO_OUTPUT_DIR / "{}.mp3".format(audio_key)
+        }
 
-        logger.info("Generation complete! ID: {}, File: {} ({:.1f} KB)".format(
-            unique_id, mp3_filename, mp3_size_kb
-        ))
+        # Step 1+2: MIDI + MP3 render queued on the worker pool; client polls /status/<id>
+        logger.info("Starting generation for ID: %s", audio_key)
+        if not submit_render_job(audio_key, genre, params, paths['midi'], paths['mp3']):
+            return jsonify({'error': 'Server sedang sibuk. Coba lagi sebentar.'}), 503
 
         return jsonify({
             'success': True,
-            'filename': mp3_filename,
-            'audio_url': '/static/audio_output/{}'.format(mp3_filename),
-            'download_url': request.url_root + 'static/audio_output/{}'.format(mp3_filename),
-            'genre': genre,
-            'tempo': params['tempo'],
-            'duration': round(duration_seconds, 1),
-            'id': unique_id,
-            'size': round(mp3_size_kb),
-            'soundfont': SOUNDFONT_PATH.name if SOUNDFONT_PATH else 'None'
-        })
+            'status': 'pending',
+            'id': audio_key,
+            'status_url': '/status/{}'.format(audio_key)
+        }), 202
 
+    except HTTPException:
+        raise  # e.g. 413 from request.form: handled by the registered error handlers
     except Exception as e:
-        logger.error("Critical error during generation: {}".format(e), exc_info=True)
+        logger.error("Critical error during generation: %s", e, exc_info=True)
         return jsonify({'error': 'Internal server error: {}'.format(str(e))}), 500
 
+@app.route('/status/<job_id>')
+def render_job_status(job_id):
+    """Poll a render job: 202 while pending, 200 with the audio details when done"""
+    metadata = AUDIO_CACHE_INDEX.get(job_id)
+    if metadata is not None:
+        return audio_response(job_id, metadata, cached=False)
+
+    with RENDER_JOBS_LOCK:
+        future = RENDER_JOBS.get(job_id)
+        if future is None:
+            render_error = FAILED_RENDERS.pop(job_id, None)
+            if render_error is None:
+                return jsonify({'error': 'Job tidak ditemukan: {}'.format(job_id)}), 404
+        elif not future.done() or not render_job_error(future):
+            # Still rendering, or finished and being registered in the cache right now
+            return jsonify({'success': True, 'status': 'pending', 'id': job_id,
+                            'status_url': '/status/{}'.format(job_id)}), 202
+        else:
+            render_error = render_job_error(future)  # Done callback has not run yet
+
+    return jsonify({'error': render_error}), 500
+
+# Delegate audio delivery to the front-end web server (nginx X-Accel-Redirect).
+# Set AUDIO_ACCEL_REDIRECT_PREFIX to e.g. '/internal_audio/' when nginx has:
+#   location /internal_audio/ { internal; alias /path/to/static/audio_output/; }
+# Unset = Flask streams the file itself (with Range support).
+AUDIO_ACCEL_REDIRECT_PREFIX = os.environ.get('AUDIO_ACCEL_REDIRECT_PREFIX', '')
+
+# Audio filenames are content hashes, so a given URL never changes content
+AUDIO_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
 @app.route('/static/audio_output/<filename>')
 def serve_audio(filename):
-    """Serve generated audio files"""
+    """Serve generated audio files (inline, seekable, long-cached)"""
     try:
-        file_path = AUDIO_OUTPUT_DIR / filename
-        if not file_path.exists():
-            logger.warning("Audio file not found: {}".format(file_path))
-            return "File not found", 404
-
         # Set MIME type
         mimetype = 'audio/mpeg' if filename.endswith('.mp3') else 'audio/wav'
-        
-        logger.info("Serving: {} ({}, {:.1f} KB)".format(
-            filename, mimetype, file_path.stat().st_size/1024
-        ))
-
-        return send_from_directory(
-            AUDIO_OUTPUT_DIR,
-            filename,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename,
-            cache_timeout=3600
-        )
-
+        logger.info("Serving: %s (%s)", filename, mimetype)
+
+        if AUDIO_ACCEL_REDIRECT_PREFIX:
+            # nginx streams the bytes; Flask only validates the name and emits headers
+            safe_path = safe_join(str(AUDIO_OUTPUT_DIR), filename)
+            if safe_path is None or not os.path.isfile(safe_path):
+                raise NotFound()
+            response = make_response('')
+            response.headers['X-Accel-Redirect'] = AUDIO_ACCEL_REDIRECT_PREFIX + filename
+            response.headers['Content-Type'] = mimetype
+        else:
+            # Werkzeug: sendfile, Range requests and 304s; raises NotFound itself
+            response = send_from_directory(
+                AUDIO_OUTPUT_DIR,
+                filename,
+                mimetype=mimetype,
+                conditional=True,
+                max_age=31536000
+            )
+        response.headers['Cache-Control'] = AUDIO_CACHE_CONTROL
+        return response
+
+    except NotFound:
+        logger.warning("Audio file not found: %s", filename)
+        return "File not found", 404
     except Exception as e:
-        logger.error("Error serving audio {}: {}".format(filename, e))
+        logger.error("Error serving audio %s: %s", filename, e)
         return "Internal server error", 500
 
+@lru_cache(maxsize=1)
 def get_local_ip():
-    """Get local network IP address"""
+    """Get local network IP address (resolved once, then cached)"""
     try:
         import socket
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -1264,24 +1571,35 @@ def main_app_runner():
         if not SOUNDFONT_PATH:
             logger.critical("CRITICAL: No SoundFont found!")
             logger.critical("Download GeneralUser GS: wget https://github.com/JustEnoughLinuxOS/generaluser-gs/releases/download/1.471/GeneralUser-GS-v1.471.sf2")
-            logger.c-10-12 09:20:15,126 - INFO - Genre detected from keywords: 'rock'
-Melody instrument: Distortion Guitar (Program 30)
-Harmony instrument: Brass Section (Program 61)
-Bass instrument: Fretless Bass (Program 35)
-2025-10-12 09:20:15,127 - INFO - Parameter musik untuk genre 'rock' (Mood: energetic): Tempo=135BPM, Durasi=128 beats
-2025-10-12 09:20:15,128 - INFO - Starting generation for ID: baa637ce_1760261234
-2025-10-12 09:20:15,129 - INFO - 1. Generating MIDI file...
-2025-10-12 09:20:15,130 - INFO - Melody track: Distortion Guitar (Program 30, Channel 0)
-2025-10-12 09:20:15,131 - INFO - Harmony track: Brass Section (Program 61, Channel 1)
-2025-10-12 09:20:15,132 - INFO - Bass track: Fretless Bass (Program 35, Channel 2)
-2025-10-12 09:20:15,133 - INFO - Drums track: Standard GM Kit (Channel 9)
-2025-10-12 09:20:15,134 - INFO - MIDI generated with channel isolation: baa637ce_1760261234.mid
-2025-10-12 09:20:15,135 - INFO - 2. Rendering MIDI to audio (FluidSynth)...
-2025-10-12 09:20:15,136 - INFO - Rendering MIDI with FluidSynth (ARM64 fixed)...
-2025-10-12 09:20:16,245 - INFO - WAV generated successfully: baa637ce_1760261234.wav (245.3 KB)
-2025-10-12 09:20:16,246 - INFO - 3. Converting to MP3 format...
-2025-10-12 09:20:16,247 - INFO - Converting WAV to MP3: baa637ce_1760261234.wav -> baa637ce_1760261234.mp3
-2025-10-12 09:20:17,156 - INFO - MP3 generated: baa637ce_1760261234.mp3 (189.7 KB)
-2025-10-12 09:20:17,157 - INFO - Temporary files cleaned up
-2025-10-12 09:20:17,158 - INFO - Generation complete! ID: baa637ce_1760261234, File: baa637ce_1760261234.mp3 (189.7 KB)
+            logger.critical("Place the .sf2 file next to this script and restart.")
+            return False
+
+        check_python_dependencies()
+        if FFMPEG_BIN is None:
+            logger.warning("FFmpeg not found - install it with: sudo apt install ffmpeg")
+
+        # Load the SoundFont in every render worker before the first request
+        try:
+            prewarm_render_pool()
+        except Exception as e:
+            logger.warning("Render pool prewarm failed: %s", e)
+
+        # IP resolved once here; get_local_ip() is cached for later callers
+        local_ip = get_local_ip()
+        logger.info("Server ready: http://127.0.0.1:5000 (local), http://%s:5000 (network)", local_ip)
+        logger.info("Available genres: %s", ', '.join(GENRE_PARAMS))
 
+    except Exception as e:
+        logger.critical("Startup error: %s", e, exc_info=True)
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    if main_app_runner():
+        try:
+            app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+        except KeyboardInterrupt:
+            logger.info("Server stopped by user")
+    else:
+        sys.exit(1)
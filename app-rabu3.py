@@ -1,18 +1,42 @@
 import os
+
+# Server gevent (GEVENT_SERVER=1, butuh `pip install gevent`): monkey patch harus sebelum import lain.
+# Worker process pool (spawn, __mp_main__) tidak di-patch; di bawah gunicorn -k gevent patch dilakukan gunicorn
+GEVENT_SERVER = os.environ.get('GEVENT_SERVER') == '1'
+if GEVENT_SERVER and __name__ == '__main__':
+    from gevent import monkey
+    monkey.patch_all()
+
 import sys
 import time
 import random
 import logging
+import re
+import gzip
 import hashlib
+import json
 import shutil
 import math
-import operator
-from datetime import datetime, timedelta
+import atexit
+import threading
+import multiprocessing
+from collections import ChainMap, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from types import MappingProxyType
+from operator import itemgetter
 from pathlib import Path
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
 import subprocess
 import tempfile
+try:
+    import fcntl  # POSIX only (ukuran buffer pipe FluidSynth -> ffmpeg)
+except ImportError:
+    fcntl = None
 from textblob import TextBlob
 
 # IMPORT MIDO untuk manipulasi MIDI
@@ -25,13 +49,10 @@ try:
 except ImportError:
     FLUIDSYNTH_BINDING_AVAILABLE = False
 
-# Import pydub untuk manipulasi audio
-from pydub import AudioSegment
-from pydub.effects import normalize as pydub_normalize
-
 # Konfigurasi logging dengan level yang lebih detail
+# LOG_LEVEL=WARNING di produksi: pesan INFO per request tidak diformat sama sekali (argumen %s lazy)
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler('app.log'),
@@ -39,11 +60,17 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+logging.raiseExceptions = False  # Error di handler log tidak menjatuhkan request
 
 # Inisialisasi Flask app
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+# Pengiriman file audio bisa diserahkan ke web server di depan Flask (opsional, lewat env):
+# AUDIO_ACCEL_REDIRECT_PREFIX=/internal/audio/ untuk nginx X-Accel-Redirect, USE_X_SENDFILE=1 untuk Apache/lighttpd
+AUDIO_ACCEL_REDIRECT_PREFIX = os.environ.get('AUDIO_ACCEL_REDIRECT_PREFIX', '')
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+
 # Path konfigurasi
 BASE_DIR = Path(__file__).parent
 STATIC_DIR = BASE_DIR / 'static'
@@ -71,6 +98,10 @@ if not SOUNDFONT_PATH:
 # Create directories
 os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
 
+# String path di-cache sekali saat startup (tanpa stat/Path per request)
+AUDIO_OUTPUT_DIR_STR = os.fspath(AUDIO_OUTPUT_DIR)
+SOUNDFONT_PATH_STR = os.fspath(SOUNDFONT_PATH) if SOUNDFONT_PATH else None
+
 def check_module(module_name):
     """Check if a module is available"""
     try:
@@ -85,11 +116,10 @@ def check_python_dependencies():
         'Flask-CORS': check_module('flask_cors'),
         'mido': check_module('mido'),
         'TextBlob': check_module('textblob'),
-        'Pydub': check_module('pydub'),
     }
 
     available_deps = [name for name, available in deps.items() if available]
-    logger.info("Python dependencies detected: {}".format(', '.join(available_deps)))
+    logger.info("Python dependencies detected: %s", ', '.join(available_deps))
     return available_deps
 
 # General MIDI Instruments (case-insensitive matching)
@@ -160,57 +190,61 @@ INSTRUMENTS = {
     'Talempong': 14, 'Gambus': 25, 'Mandolin': 27, 'Harmonica': 22,
 }
 
-# Chords (MIDI note numbers, C4 = 60)
+# Lowercased instrument names, built once for find_best_instrument
+_INSTR_LOWER_ITEMS = tuple((name.lower(), name) for name in INSTRUMENTS)
+_INSTR_LOWER_MAP = {lname: name for lname, name in _INSTR_LOWER_ITEMS}
+
+# Chords (MIDI note numbers, C4 = 60) - tuple, read-only
 CHORDS = {
     # Major chords
-    'C': [60, 64, 67], 'C#': [61, 65, 68], 'Db': [61, 65, 68],
-    'D': [62, 66, 69], 'D#': [63, 67, 70], 'Eb': [63, 67, 70],
-    'E': [64, 68, 71], 'F': [65, 69, 72], 'F#': [66, 70, 73],
-    'Gb': [66, 70, 73], 'G': [67, 71, 74], 'G#': [68, 72, 75],
-    'Ab': [68, 72, 75], 'A': [69, 73, 76], 'A#': [70, 74, 77],
-    'Bb': [70, 74, 77], 'B': [71, 75, 78],
+    'C': (60, 64, 67), 'C#': (61, 65, 68), 'Db': (61, 65, 68),
+    'D': (62, 66, 69), 'D#': (63, 67, 70), 'Eb': (63, 67, 70),
+    'E': (64, 68, 71), 'F': (65, 69, 72), 'F#': (66, 70, 73),
+    'Gb': (66, 70, 73), 'G': (67, 71, 74), 'G#': (68, 72, 75),
+    'Ab': (68, 72, 75), 'A': (69, 73, 76), 'A#': (70, 74, 77),
+    'Bb': (70, 74, 77), 'B': (71, 75, 78),
 
     # Minor chords
-    'Cm': [60, 63, 67], 'C#m': [61, 64, 68], 'Dm': [62, 65, 69],
-    'D#m': [63, 66, 70], 'Em': [64, 67, 71], 'Fm': [65, 68, 72],
-    'F#m': [66, 69, 73], 'Gm': [67, 70, 74], 'G#m': [68, 71, 75],
-    'Am': [69, 72, 76], 'A#m': [70, 73, 77], 'Bm': [71, 74, 78],
+    'Cm': (60, 63, 67), 'C#m': (61, 64, 68), 'Dm': (62, 65, 69),
+    'D#m': (63, 66, 70), 'Em': (64, 67, 71), 'Fm': (65, 68, 72),
+    'F#m': (66, 69, 73), 'Gm': (67, 70, 74), 'G#m': (68, 71, 75),
+    'Am': (69, 72, 76), 'A#m': (70, 73, 77), 'Bm': (71, 74, 78),
 
     # Seventh chords - EXPANDED untuk jazz/blues
-    'C7': [60, 64, 67, 70], 'D7': [62, 66, 69, 72], 'E7': [64, 68, 71, 74],
-    'F7': [65, 69, 72, 75], 'G7': [67, 71, 74, 77], 'A7': [69, 73, 76, 79],
-    'B7': [71, 75, 78, 82], 'Cm7': [60, 63, 67, 70], 'Dm7': [62, 65, 69, 72],
-    'Em7': [64, 67, 71, 74], 'Fm7': [65, 68, 72, 75], 'Gm7': [67, 70, 74, 77],
-    'Am7': [69, 72, 76, 79], 'Bbmaj7': [70, 74, 77, 81], 'Cmaj7': [60, 64, 67, 71],
-    'Dmaj7': [62, 66, 69, 73], 'Emaj7': [64, 68, 71, 75], 'Fmaj7': [65, 69, 72, 76],
-    'Gmaj7': [67, 71, 74, 78], 'Amaj7': [69, 73, 76, 80], 'Ebmaj7': [63, 67, 70, 74],
-    'Cm9': [60, 63, 67, 70, 74], 'Fm9': [65, 68, 72, 75, 79], 'G7b9': [67, 71, 74, 77, 80],
+    'C7': (60, 64, 67, 70), 'D7': (62, 66, 69, 72), 'E7': (64, 68, 71, 74),
+    'F7': (65, 69, 72, 75), 'G7': (67, 71, 74, 77), 'A7': (69, 73, 76, 79),
+    'B7': (71, 75, 78, 82), 'Cm7': (60, 63, 67, 70), 'Dm7': (62, 65, 69, 72),
+    'Em7': (64, 67, 71, 74), 'Fm7': (65, 68, 72, 75), 'Gm7': (67, 70, 74, 77),
+    'Am7': (69, 72, 76, 79), 'Bbmaj7': (70, 74, 77, 81), 'Cmaj7': (60, 64, 67, 71),
+    'Dmaj7': (62, 66, 69, 73), 'Emaj7': (64, 68, 71, 75), 'Fmaj7': (65, 69, 72, 76),
+    'Gmaj7': (67, 71, 74, 78), 'Amaj7': (69, 73, 76, 80), 'Ebmaj7': (63, 67, 70, 74),
+    'Cm9': (60, 63, 67, 70, 74), 'Fm9': (65, 68, 72, 75, 79), 'G7b9': (67, 71, 74, 77, 80),
 
     # Suspended chords
-    'Csus4': [60, 65, 67], 'Dsus4': [62, 67, 69], 'Esus4': [64, 69, 71],
-    'Fsus4': [65, 70, 72], 'Gsus4': [67, 72, 74], 'Asus4': [69, 74, 76],
+    'Csus4': (60, 65, 67), 'Dsus4': (62, 67, 69), 'Esus4': (64, 69, 71),
+    'Fsus4': (65, 70, 72), 'Gsus4': (67, 72, 74), 'Asus4': (69, 74, 76),
 
     # Diminished chords
-    'Cdim': [60, 63, 66], 'Ddim': [62, 65, 68], 'Edim': [64, 67, 70],
-    'Fdim': [65, 68, 71], 'Gdim': [67, 70, 73], 'Adim': [69, 72, 75],
+    'Cdim': (60, 63, 66), 'Ddim': (62, 65, 68), 'Edim': (64, 67, 70),
+    'Fdim': (65, 68, 71), 'Gdim': (67, 70, 73), 'Adim': (69, 72, 75),
 
     # Augmented chords
-    'Caug': [60, 64, 68], 'Daug': [62, 66, 70], 'Eaug': [64, 68, 72],
-    'Faug': [65, 69, 73], 'Gaug': [67, 71, 75], 'Aaug': [69, 73, 77],
+    'Caug': (60, 64, 68), 'Daug': (62, 66, 70), 'Eaug': (64, 68, 72),
+    'Faug': (65, 69, 73), 'Gaug': (67, 71, 75), 'Aaug': (69, 73, 77),
 
     # Power chords (untuk metal/rock)
-    'C5': [60, 67], 'D5': [62, 69], 'E5': [64, 71], 'F5': [65, 72],
-    'G5': [67, 74], 'A5': [69, 76], 'B5': [71, 78], 'Eb5': [63, 70],
+    'C5': (60, 67), 'D5': (62, 69), 'E5': (64, 71), 'F5': (65, 72),
+    'G5': (67, 74), 'A5': (69, 76), 'B5': (71, 78), 'Eb5': (63, 70), 'F#5': (66, 73),
 }
 
-# Scales (intervals from root note)
+# Scales (intervals from root note) - bytes: immutable, 1 byte per interval
 SCALES = {
-    'major': [0, 2, 4, 5, 7, 9, 11],
-    'minor': [0, 2, 3, 5, 7, 8, 10],
-    'blues': [0, 3, 5, 6, 7, 10],
-    'pentatonic': [0, 2, 4, 7, 9],
-    'latin': [0, 2, 4, 5, 7, 9, 10],
-    'dangdut': [0, 1, 4, 5, 7, 8, 11],
+    'major': bytes((0, 2, 4, 5, 7, 9, 11)),
+    'minor': bytes((0, 2, 3, 5, 7, 8, 10)),
+    'blues': bytes((0, 3, 5, 6, 7, 10)),
+    'pentatonic': bytes((0, 2, 4, 7, 9)),
+    'latin': bytes((0, 2, 4, 5, 7, 9, 10)),
+    'dangdut': bytes((0, 1, 4, 5, 7, 8, 11)),
 }
 
 # Standard GM Drum Notes (channel 9)
@@ -219,6 +253,13 @@ DRUM_NOTES = {
     'tom_high': 47, 'tom_mid': 45, 'tom_low': 43,
 }
 
+# Nomor note drum yang dipakai generator, di-resolve sekali saat import
+DRUM_KICK = DRUM_NOTES['kick']
+DRUM_SNARE = DRUM_NOTES['snare']
+DRUM_HAT_CLOSED = DRUM_NOTES['hat_closed']
+DRUM_TOM_MID = DRUM_NOTES['tom_mid']
+DRUM_CRASH = DRUM_NOTES['crash']
+
 # Genre parameters - OPTIMIZED untuk performa
 GENRE_PARAMS = {
     'pop': {
@@ -369,80 +410,112 @@ GENRE_PARAMS = {
 def chord_names_to_midi_notes(chord_names, key='C'):
     """Convert list of chord names to MIDI note numbers - FIXED"""
     if not isinstance(chord_names, list):
-        logger.error(f"chord_names is not a list: {type(chord_names)}")
+        logger.error("chord_names is not a list: %s", type(chord_names))
         return [CHORDS['C']]
     
+    # Fast path: semua nama dikenal -> langsung pakai tuple bersama dari CHORDS
+    if all(isinstance(name, str) and name in CHORDS for name in chord_names):
+        return [CHORDS[name] for name in chord_names]
+    
     midi_chords = []
     for i, chord_name in enumerate(chord_names):
         if isinstance(chord_name, str) and chord_name in CHORDS:
             midi_chords.append(CHORDS[chord_name])
-        elif isinstance(chord_name, list) and all(isinstance(n, int) for n in chord_name):
+        elif isinstance(chord_name, (list, tuple)) and all(isinstance(n, int) for n in chord_name):
             # Already MIDI notes, validate range
-            valid_chord = [max(0, min(127, int(n))) for n in chord_name]
+            valid_chord = tuple(max(0, min(127, int(n))) for n in chord_name)
             midi_chords.append(valid_chord)
         else:
-            logger.warning(f"Chord {i} '{chord_name}' not found in CHORDS. Using C major as fallback.")
+            logger.warning("Chord %s '%s' not found in CHORDS. Using C major as fallback.", i, chord_name)
             midi_chords.append(CHORDS['C'])
     
     return midi_chords
 
+# Lirik di bawah ini (jumlah kata) tidak dianalisis sentimen - hasilnya tidak bermakna
+MIN_SENTIMENT_WORDS = 3
+WORD_PATTERN = re.compile(r"\w+")
+
+@lru_cache(maxsize=128)
+def _analyze_lyrics(lyrics):
+    """Run TextBlob once per lyrics string: (polarity, lowercased word set)"""
+    words = WORD_PATTERN.findall(lyrics.lower())
+    if len(words) < MIN_SENTIMENT_WORDS:
+        return 0.0, frozenset(words)
+    blob = TextBlob(lyrics)
+    return blob.sentiment.polarity, frozenset(word.lower() for word in blob.words)
+
+def _is_major_progression(prog):
+    return all(not c.lower().startswith('m') and 'dim' not in c and 'sus' not in c for c in prog)
+
+def _is_minor_progression(prog):
+    return all(c.lower().startswith('m') or 'dim' in c for c in prog)
+
+# Progresi tiap genre di-resolve ke MIDI dan diklasifikasi mood sekali saat import
+for _genre_params in GENRE_PARAMS.values():
+    _progressions = _genre_params['chord_progressions']
+    _genre_params['chord_progressions_midi'] = [chord_names_to_midi_notes(prog) for prog in _progressions]
+    _genre_params['major_progression_indices'] = tuple(
+        i for i, prog in enumerate(_progressions) if _is_major_progression(prog))
+    _genre_params['minor_progression_indices'] = tuple(
+        i for i, prog in enumerate(_progressions) if _is_minor_progression(prog))
+
+# Template genre dibekukan (read-only); params per request = overlay ChainMap di atasnya, tanpa copy
+GENRE_PARAMS = {
+    genre: MappingProxyType({**genre_params, 'instruments': MappingProxyType(genre_params['instruments'])})
+    for genre, genre_params in GENRE_PARAMS.items()
+}
+
 def select_progression(params, lyrics=""):
-    """Select chord progression based on mood and sentiment analysis - OPTIMIZED"""
+    """Select chord progression based on mood and sentiment - returns (names, pre-resolved MIDI chords)"""
     progressions = params['chord_progressions']
+    candidates = range(len(progressions))
     
     if lyrics and len(lyrics.strip()) > 0:
         try:
-            blob = TextBlob(lyrics)
-            polarity = blob.sentiment.polarity
+            polarity = _analyze_lyrics(lyrics)[0]
             
             if polarity > 0.1: # Happy mood
-                major_progressions = [prog for prog in progressions 
-                                    if all(not c.lower().startswith('m') and 'dim' not in c and 'sus' not in c 
-                                         for c in prog)]
-                if major_progressions:
-                    return random.choice(major_progressions)
-            
+                candidates = params['major_progression_indices'] or candidates
             elif polarity < -0.1: # Sad mood
-                minor_progressions = [prog for prog in progressions 
-                                    if all(c.lower().startswith('m') or 'dim' in c for c in prog)]
-                if minor_progressions:
-                    return random.choice(minor_progressions)
+                candidates = params['minor_progression_indices'] or candidates
         except Exception as e:
-            logger.warning(f"Sentiment analysis error: {e}")
+            logger.warning("Sentiment analysis error: %s", e)
     
-    selected = random.choice(progressions)
-    logger.info("Selected progression: {} for mood {}".format(selected, params['mood']))
-    return selected
+    index = random.choice(candidates)
+    selected = progressions[index]
+    logger.info("Selected progression: %s for mood %s", selected, params['mood'])
+    return selected, params['chord_progressions_midi'][index]
+
+# Genre keywords (frozenset untuk scoring via set intersection)
+GENRE_KEYWORDS = {
+    'pop': frozenset(['love', 'heart', 'dream', 'dance', 'party', 'fun', 'happy', 'tonight', 'forever', 'together']),
+    'rock': frozenset(['rock', 'guitar', 'energy', 'power', 'fire', 'wild', 'roll', 'scream', 'freedom']),
+    'metal': frozenset(['metal', 'heavy', 'dark', 'scream', 'thunder', 'steel', 'rage', 'shadow', 'death']),
+    'ballad': frozenset(['sad', 'love', 'heartbreak', 'memory', 'gentle', 'soft', 'tears', 'alone', 'forever']),
+    'blues': frozenset(['soul', 'heartache', 'guitar', 'night', 'trouble', 'baby', 'lonely']),
+    'jazz': frozenset(['jazz', 'smooth', 'night', 'sax', 'swing', 'harmony', 'blue', 'lounge']),
+    'hiphop': frozenset(['rap', 'street', 'beat', 'flow', 'rhythm', 'hustle', 'city', 'time', 'crew']),
+    'latin': frozenset(['latin', 'bossanova', 'salsa', 'rhythm', 'dance', 'passion', 'fiesta', 'caliente', 'amor']),
+    'dangdut': frozenset(['dangdut', 'tradisional', 'cinta', 'hati', 'kenangan', 'indonesia', 'rindu', 'sayang', 'melayu']),
+}
 
 def detect_genre_from_lyrics(lyrics):
     """Detect genre from lyrics using keyword matching - OPTIMIZED"""
     if not lyrics or len(lyrics.strip()) == 0:
         return 'pop'
     
-    keywords = {
-        'pop': ['love', 'heart', 'dream', 'dance', 'party', 'fun', 'happy', 'tonight', 'forever', 'together'],
-        'rock': ['rock', 'guitar', 'energy', 'power', 'fire', 'wild', 'roll', 'scream', 'freedom'],
-        'metal': ['metal', 'heavy', 'dark', 'scream', 'thunder', 'steel', 'rage', 'shadow', 'death'],
-        'ballad': ['sad', 'love', 'heartbreak', 'memory', 'gentle', 'soft', 'tears', 'alone', 'forever'],
-        'blues': ['soul', 'heartache', 'guitar', 'night', 'trouble', 'baby', 'lonely'],
-        'jazz': ['jazz', 'smooth', 'night', 'sax', 'swing', 'harmony', 'blue', 'lounge'],
-        'hiphop': ['rap', 'street', 'beat', 'flow', 'rhythm', 'hustle', 'city', 'time', 'crew'],
-        'latin': ['latin', 'bossanova', 'salsa', 'rhythm', 'dance', 'passion', 'fiesta', 'caliente', 'amor'],
-        'dangdut': ['dangdut', 'tradisional', 'cinta', 'hati', 'kenangan', 'indonesia', 'rindu', 'sayang', 'melayu']
-    }
-
     try:
-        blob = TextBlob(lyrics.lower())
-        words = set(blob.words)
-
-        scores = {genre: sum(1 for keyword in kw_list if keyword in words)
-                  for genre, kw_list in keywords.items()}
-
-        detected_genre = max(scores, key=scores.get) if max(scores.values()) > 0 else 'pop'
-        logger.info("Genre detected from keywords: '{}'".format(detected_genre))
+        words = _analyze_lyrics(lyrics)[1]
+
+        detected_genre, best_score = 'pop', 0
+        for genre, kw_set in GENRE_KEYWORDS.items():
+            score = len(kw_set & words)
+            if score > best_score:
+                detected_genre, best_score = genre, score
+        logger.info("Genre detected from keywords: '%s'", detected_genre)
         return detected_genre
     except Exception as e:
-        logger.warning(f"Genre detection error: {e}")
+        logger.warning("Genre detection error: %s", e)
         return 'pop'
 
 def find_best_instrument(choice, is_rock_metal=False):
@@ -453,23 +526,50 @@ def find_best_instrument(choice, is_rock_metal=False):
     if isinstance(choice, list):
         choice = choice[0]  # Ambil yang pertama
     
-    choice_lower = str(choice).lower().strip()
-    
+    return _match_instrument(str(choice).lower().strip(), is_rock_metal)
+
+@lru_cache(maxsize=256)
+def _match_instrument(choice_lower, is_rock_metal):
+    """Resolve a lowercased instrument choice against the precomputed name index"""
     if is_rock_metal and 'power chord' in choice_lower:
         return 'Overdriven Guitar'
     
-    for instr_name, num in INSTRUMENTS.items():
-        if choice_lower in instr_name.lower():
-            return instr_name
+    hit = _INSTR_LOWER_MAP.get(choice_lower)
+    if hit:
+        return hit
     
-    logger.warning(f"No good instrument match for '{choice}', falling back to Acoustic Grand Piano.")
+    for lname, name in _INSTR_LOWER_ITEMS:
+        if choice_lower in lname:
+            return name
+    
+    logger.warning("No good instrument match for '%s', falling back to Acoustic Grand Piano.", choice_lower)
     return 'Acoustic Grand Piano'
 
 def get_music_params_from_lyrics(genre, lyrics, user_tempo_input='auto'):
-    """Generate instrumental parameters - OPTIMIZED dengan error handling"""
+    """Generate instrumental parameters - tempo/mood/scale/instruments cached per (genre, lirik, tempo), progression per call"""
+    # Tulisan caller (termasuk progression) masuk ke layer baru, entry cache tetap read-only
+    params = _music_params_cached(genre, lyrics, user_tempo_input).new_child()
+
+    # Progression dipilih acak: diundi tiap panggilan, tidak ikut di-cache
+    params['selected_progression'], params['chords'] = select_progression(params, lyrics)
+
+    logger.info("Parameter instrumental untuk %s (Mood: %s): Tempo=%sBPM, Progression=%s",
+                genre, params['mood'], params['tempo'], params['selected_progression'])
+    return params
+
+@lru_cache(maxsize=256)
+def _music_params_cached(genre, lyrics, user_tempo_input):
+    """Read-only params per input: overlay (MappingProxyType) di atas template genre yang beku"""
+    params = _build_music_params(genre, lyrics, user_tempo_input)
+    overlay = {**params.maps[0], 'instruments': MappingProxyType(params['instruments'])}
+    return ChainMap(MappingProxyType(overlay), *params.maps[1:])
+
+def _build_music_params(genre, lyrics, user_tempo_input):
+    """Deterministic instrumental parameters (tempo, mood, scale, instruments) - OPTIMIZED dengan error handling"""
     try:
-        params = GENRE_PARAMS.get(genre.lower(), GENRE_PARAMS['pop']).copy()
-        params['genre'] = genre
+        # Overlay per request: hanya field yang berubah (plus 'instruments' baru), template genre dibagi read-only
+        base_params = GENRE_PARAMS.get(genre.lower(), GENRE_PARAMS['pop'])
+        params = ChainMap({'genre': genre, 'instruments': dict(base_params['instruments'])}, base_params)
 
         # Handle tempo input
         if user_tempo_input != 'auto':
@@ -478,15 +578,14 @@ def get_music_params_from_lyrics(genre, lyrics, user_tempo_input='auto'):
                 if 60 <= tempo_val <= 200:
                     params['tempo'] = tempo_val
                 else:
-                    logger.warning("Tempo out of range (60-200 BPM): {}, using default.".format(user_tempo_input))
+                    logger.warning("Tempo out of range (60-200 BPM): %s, using default.", user_tempo_input)
             except ValueError:
-                logger.warning("Invalid tempo input: '{}', using default.".format(user_tempo_input))
+                logger.warning("Invalid tempo input: '%s', using default.", user_tempo_input)
 
         # Sentiment analysis
         if lyrics and len(lyrics.strip()) > 0:
             try:
-                blob = TextBlob(lyrics)
-                sentiment = blob.sentiment.polarity
+                sentiment = _analyze_lyrics(lyrics)[0]
 
                 if sentiment < -0.3:
                     params['mood'] = 'sad'
@@ -495,7 +594,7 @@ def get_music_params_from_lyrics(genre, lyrics, user_tempo_input='auto'):
                     params['mood'] = 'happy'
                     params['scale'] = 'major'
             except Exception as e:
-                logger.warning(f"Sentiment analysis error: {e}")
+                logger.warning("Sentiment analysis error: %s", e)
         
         # Ensure valid scale
         if params['scale'] not in SCALES:
@@ -509,77 +608,108 @@ def get_music_params_from_lyrics(genre, lyrics, user_tempo_input='auto'):
             )
 
         # Log instruments
-        for category, instrument_name in params['instruments'].items():
-            program_num = INSTRUMENTS.get(instrument_name, 0)
-            logger.info("{} instrument: {} (Program {})".format(
-                category.capitalize(), instrument_name, program_num
-            ))
-
-        # FIXED: Convert chord names to MIDI notes IMMEDIATELY
-        selected_progression_names = select_progression(params, lyrics)
-        params['chords'] = chord_names_to_midi_notes(selected_progression_names)
-        params['selected_progression'] = selected_progression_names
-
-        logger.info("Parameter instrumental untuk {} (Mood: {}): Tempo={}BPM, Progression={}".format(
-            genre, params['mood'], params['tempo'], selected_progression_names
-        ))
+        if logger.isEnabledFor(logging.INFO):
+            for category, instrument_name in params['instruments'].items():
+                program_num = INSTRUMENTS.get(instrument_name, 0)
+                logger.info("%s instrument: %s (Program %s)", category.capitalize(), instrument_name, program_num)
 
         return params
 
     except Exception as e:
-        logger.error(f"Error in get_music_params_from_lyrics: {e}")
+        logger.error("Error in get_music_params_from_lyrics: %s", e)
         # Fallback to default pop parameters
-        default_params = GENRE_PARAMS['pop'].copy()
-        default_params['chords'] = [CHORDS['C']]
-        default_params['selected_progression'] = ['C']
-        return default_params
-
+        return ChainMap({'instruments': dict(GENRE_PARAMS['pop']['instruments'])}, GENRE_PARAMS['pop'])
+
+@lru_cache(maxsize=1024)
+def _canonical_progression(progression_key):
+    """Validate a hashable progression key into a tuple of clamped MIDI-note tuples"""
+    validated_chords = []
+    for i, chord in enumerate(progression_key):
+        if isinstance(chord, str) and chord in CHORDS:
+            validated_chords.append(CHORDS[chord])
+        elif isinstance(chord, tuple) and chord:
+            valid_notes = []
+            for note in chord:
+                if isinstance(note, (int, float)):
+                    valid_notes.append(max(0, min(127, int(round(note)))))
+                else:
+                    logger.warning("Invalid note %s in chord %s, using 60", note, i)
+                    valid_notes.append(60)
+            validated_chords.append(tuple(valid_notes))
+        else:
+            logger.warning("Chord %s is invalid: %s, using C major", i, chord)
+            validated_chords.append(CHORDS['C'])
+    return tuple(validated_chords)
+
+def validate_chord_progression(progression):
+    """Canonical tuple-of-tuples for a progression of chord names or MIDI notes (memoized)"""
+    if not isinstance(progression, (list, tuple)) or len(progression) == 0:
+        logger.warning("Invalid chord progression, using C major")
+        return (CHORDS['C'],)
+    try:
+        return _canonical_progression(tuple(
+            tuple(chord) if isinstance(chord, list) else chord if isinstance(chord, (str, tuple)) else None
+            for chord in progression))
+    except TypeError:  # unhashable isi chord
+        logger.warning("Unhashable chord progression %s, using C major", progression)
+        return (CHORDS['C'],)
+
+@lru_cache(maxsize=128)
 def get_scale_notes(key, scale_name):
-    """Get scale notes based on key and scale type - FIXED"""
+    """Get scale notes based on key and scale type - CACHED (tuple)"""
     try:
         if key not in CHORDS:
             key = 'C'
         root_midi = CHORDS[key][0]
         scale_intervals = SCALES.get(scale_name, SCALES['major'])
-        return [root_midi + interval for interval in scale_intervals]
+        return tuple(root_midi + interval for interval in scale_intervals)
     except Exception as e:
-        logger.error(f"Error in get_scale_notes: {e}")
-        return [60, 62, 64, 65, 67, 69, 71]  # C major scale
+        logger.error("Error in get_scale_notes: %s", e)
+        return (60, 62, 64, 65, 67, 69, 71)  # C major scale
+
+@lru_cache(maxsize=512)
+def filter_scale_by_chord(scale_notes, chord):
+    """Scale notes whose pitch class is in the chord (bitmask), or the full scale if none match"""
+    mask = 0
+    for note in chord:
+        mask |= 1 << (int(note) % 12)
+    pitches = tuple(p for p in scale_notes if mask >> (p % 12) & 1)
+    return pitches or scale_notes
+
+# Grid kuantisasi pitch bend (1/16 beat)
+PITCH_BEND_QUANT = 0.0625
+PITCH_BEND_QUANT_STEPS = 16.0
+
+# Interval walking bass dari root (semitone)
+WALKING_BASS_INTERVALS = (0, 2, 5, 7)
+
+@lru_cache(maxsize=256)
+def chord_rhythm_notes(chord, is_power_chord):
+    """Clamped rhythm notes for a chord (power chord voicing for rock/metal) - CACHED"""
+    if is_power_chord:
+        root = chord[0]
+        notes = (root, root + 7, root + 12) if len(chord) > 2 else (root, root + 7)
+    else:
+        notes = chord
+    return tuple(max(36, min(84, int(note))) for note in notes)
+
+@lru_cache(maxsize=256)
+def chord_bass_notes(chord):
+    """(root, walking pitches) for a chord in bass range - CACHED"""
+    root_note = max(24, min(48, int(chord[0]) - 24))
+    return root_note, tuple(max(24, min(60, root_note + interval)) for interval in WALKING_BASS_INTERVALS)
+
+def draw_velocities(low, high, count):
+    """Batch of `count` random velocities in [low, high] from a single RNG call"""
+    return random.choices(range(low, high + 1), k=count)
 
 def generate_melody_section(params, section_beats, current_chord_progression, is_solo=False, add_expressive_effects=True):
     """Generates melody for a single section - FULLY FIXED"""
     try:
         scale_notes = get_scale_notes(params['key'], params['scale'])
-        melody_events = []
         pitch_bend_events = []
 
-        # FIXED: Validate and convert chord progression to MIDI notes if needed
-        if not isinstance(current_chord_progression, list) or len(current_chord_progression) == 0:
-            logger.warning("Invalid chord progression for melody, using C major")
-            current_chord_progression = [CHORDS['C']]
-
-        # Ensure all chords are lists of integers
-        validated_chords = []
-        for i, chord in enumerate(current_chord_progression):
-            if isinstance(chord, str) and chord in CHORDS:
-                # Convert string chord name to MIDI notes
-                validated_chords.append(CHORDS[chord])
-                logger.debug(f"Converted string chord '{chord}' to MIDI notes")
-            elif isinstance(chord, list) and len(chord) > 0:
-                # Validate existing MIDI notes
-                valid_notes = []
-                for note in chord:
-                    if isinstance(note, (int, float)):
-                        valid_notes.append(max(0, min(127, int(round(note)))))
-                    else:
-                        logger.warning(f"Invalid note {note} in chord {i}, using 60")
-                        valid_notes.append(60)
-                validated_chords.append(valid_notes)
-            else:
-                logger.warning(f"Chord {i} is invalid: {chord}, using C major")
-                validated_chords.append(CHORDS['C'])
-
-        current_chord_progression = validated_chords
+        current_chord_progression = validate_chord_progression(current_chord_progression)
 
         # Melody patterns based on mood - SIMPLIFIED untuk performa
         if params['mood'] == 'sad':
@@ -604,91 +734,84 @@ def generate_melody_section(params, section_beats, current_chord_progression, is
             patterns = [[1, 1, 1, 1, 2, 2, 4], [2, 1, 1, 2, 1, 1, 2]]
             velocities = [110, 127]
 
-        current_pattern = random.choice(patterns)
         current_velocity = random.choice(velocities)
 
-        time_pos_beats = 0.0
-        pattern_idx = 0
         quarter_to_beat = 0.25
         max_notes = int(section_beats * 4)  # Limit notes untuk performa
-        note_count = 0
-
-        while time_pos_beats < section_beats and note_count < max_notes:
-            if pattern_idx >= len(current_pattern):
-                current_pattern = random.choice(patterns)
-                pattern_idx = 0
 
-            pattern_quarter_duration = current_pattern[pattern_idx]
-            beat_duration = pattern_quarter_duration * quarter_to_beat
-            
-            if time_pos_beats + beat_duration > section_beats:
-                beat_duration = section_beats - time_pos_beats
-                if beat_duration < 0.01:
+        # Jadwal ritme dihitung sekali di depan: (start, durasi) per not
+        schedule = []
+        time_pos_beats = 0.0
+        while time_pos_beats < section_beats and len(schedule) < max_notes:
+            for pattern_quarter_duration in random.choice(patterns):
+                beat_duration = pattern_quarter_duration * quarter_to_beat
+                if time_pos_beats + beat_duration > section_beats:
+                    beat_duration = section_beats - time_pos_beats
+                    if beat_duration < 0.01:
+                        time_pos_beats = section_beats
+                        break
+                schedule.append((time_pos_beats, beat_duration))
+                time_pos_beats += beat_duration
+                if time_pos_beats >= section_beats or len(schedule) >= max_notes:
                     break
 
-            # FIXED: Safe chord selection
-            chord_index = 0
-            if len(current_chord_progression) > 0:
-                chord_index = min(int((time_pos_beats / section_beats) * len(current_chord_progression)), 
-                                len(current_chord_progression) - 1)
-                current_chord = current_chord_progression[chord_index]
-            else:
-                current_chord = CHORDS['C']
+        # Semua angka acak diambil dalam satu batch, bukan per not
+        note_count = len(schedule)
+        octave_draws = random.choices((0, 12), k=note_count)
+        velocity_draws = draw_velocities(current_velocity - 10, current_velocity + 10, note_count)
+        rand = random.random
+        index_draws = [rand() for _ in range(note_count)]
+        effect_draws = [rand() for _ in range(note_count)] if add_expressive_effects else None
 
-            # FIXED: Safe pitch calculation using operator.mod
-            try:
-                chord_root_classes = [operator.mod(int(note), 12) for note in current_chord]
-                possible_pitches = [p for p in scale_notes if operator.mod(int(p), 12) in chord_root_classes]
-            except Exception as e:
-                logger.error(f"Error calculating pitches: {e}")
-                possible_pitches = scale_notes
+        # Pitch yang cocok untuk tiap akor dihitung sekali sebelum loop
+        pitches_per_chord = [filter_scale_by_chord(scale_notes, chord)
+                             for chord in current_chord_progression]
+        chord_count = len(pitches_per_chord)
+        last_chord_index = chord_count - 1
+        chord_scale = chord_count / section_beats
+
+        # Jumlah not sudah pasti dari schedule: alokasi sekali, isi per indeks
+        melody_events = [None] * note_count
 
-            if not possible_pitches:
-                possible_pitches = scale_notes
+        for n, (time_pos_beats, beat_duration) in enumerate(schedule):
+            possible_pitches = pitches_per_chord[min(int(time_pos_beats * chord_scale), last_chord_index)]
 
             # Generate note
-            octave_range = random.choice([0, 12])
-            note_index = random.randint(0, len(possible_pitches) - 1)
-            pitch = possible_pitches[note_index] + octave_range
+            note_index = int(index_draws[n] * len(possible_pitches))
+            pitch = possible_pitches[note_index] + octave_draws[n]
             pitch = max(48, min(pitch, 84))
             
-            velocity = current_velocity + random.randint(-10, 10)
-            velocity = max(40, min(velocity, 127))
+            velocity = max(40, min(velocity_draws[n], 127))
             
-            melody_events.append((int(pitch), time_pos_beats, beat_duration, int(velocity)))
-            note_count += 1
+            melody_events[n] = (pitch, time_pos_beats, beat_duration, velocity)
 
             # Simplified expressive effects untuk performa
-            if add_expressive_effects and beat_duration >= 1.0 and random.random() < 0.2:
+            if add_expressive_effects and beat_duration >= 1.0 and effect_draws[n] < 0.2:
                 # Simple vibrato
                 vibrato_time = time_pos_beats + beat_duration * 0.3
                 if vibrato_time < time_pos_beats + beat_duration:
                     pitch_bend_events.append((vibrato_time, 500))
                     pitch_bend_events.append((vibrato_time + 0.1, -500))
 
-            time_pos_beats += beat_duration
-            pattern_idx += 1
-
         # Simplified pitch bend cleanup
+        # Event dibuat berurutan waktu (schedule naik), jadi tidak perlu sort.
+        # Di grid 1/16 beat, "jarak > 1/32" sama dengan "langkah grid berbeda": cukup bandingkan int.
         if pitch_bend_events:
-            pitch_bend_events.sort(key=lambda x: x[0])
             pitch_bend_events_cleaned = []
-            last_time = -1.0
+            last_step = -1
             for event_time, bend_value in pitch_bend_events:
-                quantized_time = round(event_time / 0.0625) * 0.0625
-                bend_int = max(-8192, min(8191, int(round(bend_value))))
-                
-                if quantized_time > last_time + 0.03125:
-                    pitch_bend_events_cleaned.append((quantized_time, bend_int))
-                    last_time = quantized_time
+                step = round(event_time * PITCH_BEND_QUANT_STEPS)
+                if step > last_step:
+                    pitch_bend_events_cleaned.append((step * PITCH_BEND_QUANT, max(-8192, min(8191, int(bend_value)))))
+                    last_step = step
             
             pitch_bend_events = pitch_bend_events_cleaned
 
-        logger.debug(f"Generated {len(melody_events)} melody events for {section_beats} beats")
+        logger.debug("Generated %s melody events for %s beats", len(melody_events), section_beats)
         return melody_events, pitch_bend_events
 
     except Exception as e:
-        logger.error(f"Critical error in generate_melody_section: {e}", exc_info=True)
+        logger.error("Critical error in generate_melody_section: %s", e, exc_info=True)
         return [], []
 
 # [Fungsi lainnya tetap sama seperti sebelumnya, tapi dengan validasi yang lebih ketat]
@@ -696,25 +819,12 @@ def generate_melody_section(params, section_beats, current_chord_progression, is
 def generate_rhythm_primary_section(params, section_beats, current_chord_progression):
     """Generates rhythm - OPTIMIZED dengan validasi"""
     try:
+        # Velocity diambil satu batch per akor
         rhythm_data = []
         time_pos_beats = 0.0
         
-        # Validate chord progression
-        if not isinstance(current_chord_progression, list) or len(current_chord_progression) == 0:
-            current_chord_progression = [CHORDS['C']]
-        
-        # Convert string chords to MIDI if needed
-        validated_chords = []
-        for chord in current_chord_progression:
-            if isinstance(chord, str) and chord in CHORDS:
-                validated_chords.append(CHORDS[chord])
-            elif isinstance(chord, list):
-                validated_chords.append([max(0, min(127, int(n))) for n in chord])
-            else:
-                validated_chords.append(CHORDS['C'])
-        
-        current_chord_progression = validated_chords
-        beats_per_chord = section_beats / len(current_chord_progression) if len(current_chord_progression) > 0 else section_beats
+        current_chord_progression = validate_chord_progression(current_chord_progression)
+        beats_per_chord = section_beats / len(current_chord_progression)
 
         base_velocity = 80
         if params['genre'] in ['rock', 'metal']:
@@ -730,39 +840,29 @@ def generate_rhythm_primary_section(params, section_beats, current_chord_progres
             if chord_duration < 0.5:
                 break
 
-            if is_power_chord and len(chord_notes) > 0:
-                # Power chord: root + fifth
-                root = chord_notes[0]
-                power_notes = [root, root + 7]
-                if len(chord_notes) > 2:
-                    power_notes.append(root + 12)
-                
-                # Generate power chord pattern
-                for beat_offset in range(0, int(chord_duration), 1):
-                    beat_time = time_pos_beats + beat_offset
-                    if beat_time >= section_beats:
-                        break
-                    for note in power_notes:
-                        safe_note = max(36, min(84, int(note)))
-                        velocity = random.randint(base_velocity, base_velocity + 20)
-                        rhythm_data.append((safe_note, beat_time, 0.8, velocity))
+            # Power chord: root + fifth (+ octave); tabel nada di-cache per akor
+            safe_notes = chord_rhythm_notes(chord_notes, is_power_chord)
+            if is_power_chord:
+                beat_offsets = range(0, int(chord_duration), 1)
+                velocity_low, velocity_high = base_velocity, base_velocity + 20
+                note_duration = 0.8
             else:
                 # Standard chord
-                for beat_offset in range(0, int(chord_duration), 2):
-                    beat_time = time_pos_beats + beat_offset
-                    if beat_time >= section_beats:
-                        break
-                    for note in chord_notes:
-                        safe_note = max(36, min(84, int(note)))
-                        velocity = random.randint(base_velocity - 10, base_velocity + 10)
-                        rhythm_data.append((safe_note, beat_time, 1.5, velocity))
+                beat_offsets = range(0, int(chord_duration), 2)
+                velocity_low, velocity_high = base_velocity - 10, base_velocity + 10
+                note_duration = 1.5
+
+            # beat_time < time_pos + chord_duration <= section_beats, jadi tidak perlu cek per beat
+            velocities = iter(draw_velocities(velocity_low, velocity_high, len(beat_offsets) * len(safe_notes)))
+            rhythm_data += [(safe_note, time_pos_beats + beat_offset, note_duration, next(velocities))
+                            for beat_offset in beat_offsets for safe_note in safe_notes]
 
             time_pos_beats += chord_duration
 
         return rhythm_data[:int(section_beats * 2)]  # Limit events untuk performa
 
     except Exception as e:
-        logger.error(f"Error in generate_rhythm_primary_section: {e}")
+        logger.error("Error in generate_rhythm_primary_section: %s", e)
         return []
 
 def generate_rhythm_secondary_section(params, section_beats, current_chord_progression):
@@ -771,11 +871,8 @@ def generate_rhythm_secondary_section(params, section_beats, current_chord_progr
         rhythm_data = []
         time_pos_beats = 0.0
         
-        # Quick validation
-        if not isinstance(current_chord_progression, list):
-            current_chord_progression = [CHORDS['C']]
-        
-        beats_per_chord = section_beats / max(1, len(current_chord_progression))
+        current_chord_progression = validate_chord_progression(current_chord_progression)
+        beats_per_chord = section_beats / len(current_chord_progression)
         base_velocity = 70
 
         for i in range(min(4, len(current_chord_progression))):  # Limit to 4 chords max
@@ -783,22 +880,19 @@ def generate_rhythm_secondary_section(params, section_beats, current_chord_progr
             if chord_duration < 1.0:
                 break
 
-            chord_notes = current_chord_progression[i] if i < len(current_chord_progression) else CHORDS['C']
-            if not isinstance(chord_notes, list):
-                chord_notes = CHORDS['C']
+            chord_notes = current_chord_progression[i]
 
-            # Simple sustained chords
-            for note in chord_notes[:3]:  # Max 3 notes per chord
-                safe_note = max(48, min(72, int(note)))
-                velocity = random.randint(base_velocity - 5, base_velocity + 5)
-                rhythm_data.append((safe_note, time_pos_beats, chord_duration, velocity))
+            # Simple sustained chords, max 3 notes per chord
+            notes = chord_notes[:3]
+            rhythm_data += [(max(48, min(72, int(note))), time_pos_beats, chord_duration, velocity)
+                            for note, velocity in zip(notes, draw_velocities(base_velocity - 5, base_velocity + 5, len(notes)))]
 
             time_pos_beats += chord_duration
 
         return rhythm_data
 
     except Exception as e:
-        logger.error(f"Error in generate_rhythm_secondary_section: {e}")
+        logger.error("Error in generate_rhythm_secondary_section: %s", e)
         return []
 
 def generate_bass_line_section(params, section_beats, current_chord_progression):
@@ -807,145 +901,208 @@ def generate_bass_line_section(params, section_beats, current_chord_progression)
         bass_events = []
         time_pos_beats = 0.0
         
-        if not isinstance(current_chord_progression, list):
-            current_chord_progression = [CHORDS['C']]
-        
-        beats_per_chord = section_beats / max(1, len(current_chord_progression))
+        current_chord_progression = validate_chord_progression(current_chord_progression)
+        beats_per_chord = section_beats / len(current_chord_progression)
         base_velocity = 100
 
         bass_style = params.get('bass_style', 'melodic')
 
         for i in range(len(current_chord_progression)):
-            chord_notes = current_chord_progression[i] if i < len(current_chord_progression) else CHORDS['C']
-            if not isinstance(chord_notes, list) or len(chord_notes) == 0:
-                chord_notes = CHORDS['C']
-            
-            root_note = max(24, min(48, int(chord_notes[0]) - 24))  # Bass range
+            root_note, walk_pitches = chord_bass_notes(current_chord_progression[i])  # Bass range
             chord_duration = min(beats_per_chord, section_beats - time_pos_beats)
             if chord_duration < 0.5:
                 break
 
             if bass_style in ['walking', 'syncopated']:
-                # Walking bass pattern
-                for beat_offset in range(0, int(chord_duration), 1):
-                    beat_time = time_pos_beats + beat_offset
-                    if beat_time >= section_beats:
-                        break
-                    
-                    note = root_note
-                    if beat_offset % 2 == 1:  # Off-beat
-                        note += random.choice([0, 2, 5, 7])
-                    
-                    safe_note = max(24, min(60, int(note)))
-                    velocity = random.randint(base_velocity - 10, base_velocity + 10)
-                    bass_events.append((safe_note, beat_time, 0.8, velocity))
+                # Walking bass pattern: off-beat dapat interval acak dari root
+                beat_offsets = range(0, int(chord_duration), 1)
+                velocities = draw_velocities(base_velocity - 10, base_velocity + 10, len(beat_offsets))
+                walk_notes = iter(random.choices(walk_pitches, k=len(beat_offsets) // 2))
+                bass_events += [
+                    (next(walk_notes) if beat_offset % 2 == 1 else root_note,
+                     time_pos_beats + beat_offset, 0.8, velocity)
+                    for beat_offset, velocity in zip(beat_offsets, velocities)
+                ]
             else:
                 # Simple root notes
-                for beat_offset in range(0, int(chord_duration), 2):
-                    beat_time = time_pos_beats + beat_offset
-                    if beat_time >= section_beats:
-                        break
-                    
-                    safe_note = root_note
-                    velocity = random.randint(base_velocity - 10, base_velocity + 5)
-                    bass_events.append((safe_note, beat_time, 1.5, velocity))
+                beat_offsets = range(0, int(chord_duration), 2)
+                velocities = draw_velocities(base_velocity - 10, base_velocity + 5, len(beat_offsets))
+                bass_events += [(root_note, time_pos_beats + beat_offset, 1.5, velocity)
+                                for beat_offset, velocity in zip(beat_offsets, velocities)]
 
             time_pos_beats += chord_duration
 
         return bass_events[:int(section_beats * 1.5)]  # Limit events
 
     except Exception as e:
-        logger.error(f"Error in generate_bass_line_section: {e}")
+        logger.error("Error in generate_bass_line_section: %s", e)
         return []
 
+# Section dengan aksen kick (chorus/outro) dan snare (chorus)
+KICK_ACCENT_SECTIONS = frozenset(('chorus', 'outro'))
+SNARE_ACCENT_SECTIONS = frozenset(('chorus',))
+
 def generate_drum_pattern_section(params, section_type, section_beats):
     """Generates drum pattern - OPTIMIZED untuk performa"""
     try:
-        drum_events = []
-        
         # Simplified drum velocities
-        kick_vel = min(127, 100 + (20 if section_type in ['chorus', 'outro'] else 0))
-        snare_vel = min(127, 90 + (20 if section_type in ['chorus'] else 0))
+        kick_vel = min(127, 100 + (20 if section_type in KICK_ACCENT_SECTIONS else 0))
+        snare_vel = min(127, 90 + (20 if section_type in SNARE_ACCENT_SECTIONS else 0))
         hat_vel = 70
 
-        # Basic drum pattern
-        for beat_idx in range(0, int(section_beats)):
-            beat_time = float(beat_idx)
-
-            # Kick on beats 1 and 3
-            if beat_idx % 4 in [0, 2]:
-                drum_events.append((DRUM_NOTES['kick'], beat_time, 0.4, random.randint(kick_vel - 10, kick_vel)))
-
-            # Snare on beats 2 and 4
-            if beat_idx % 4 in [1, 3]:
-                drum_events.append((DRUM_NOTES['snare'], beat_time, 0.4, random.randint(snare_vel - 10, snare_vel)))
+        # Posisi dihitung sebagai range, velocity diambil satu batch per instrumen
+        num_beats = int(section_beats)
+        kick_beats = range(0, num_beats, 2)   # Kick on beats 1 and 3 (beat_idx % 4 in 0, 2)
+        snare_beats = range(1, num_beats, 2)  # Snare on beats 2 and 4 (beat_idx % 4 in 1, 3)
+        # Batas dihitung sekali (tanpa cek per beat): hi-hat t < section_beats, fill beat_idx < section_beats - 2
+        hat_times = [half * 0.5 for half in range(min(2 * num_beats, math.ceil(section_beats * 2)))]  # Eighth notes
+        fill_times = [beat_idx + 0.5 for beat_idx in range(7, min(num_beats, math.ceil(section_beats - 2)), 8)]  # End of phrase
 
-            # Hi-hat on eighth notes
-            for eighth in [0, 0.5]:
-                hat_time = beat_time + eighth
-                if hat_time < section_beats:
-                    drum_events.append((DRUM_NOTES['hat_closed'], hat_time, 0.2, random.randint(hat_vel - 10, hat_vel)))
+        kick_vels = draw_velocities(kick_vel - 10, kick_vel, len(kick_beats))
+        snare_vels = draw_velocities(snare_vel - 10, snare_vel, len(snare_beats))
+        hat_vels = draw_velocities(hat_vel - 10, hat_vel, len(hat_times))
 
-            # Occasional fills
-            if beat_idx % 8 == 7 and beat_idx < section_beats - 2:  # End of phrase
-                fill_time = beat_time + 0.5
-                if fill_time < section_beats:
-                    drum_events.append((DRUM_NOTES['tom_mid'], fill_time, 0.3, 90))
+        drum_events = [(DRUM_KICK, float(b), 0.4, v) for b, v in zip(kick_beats, kick_vels)]
+        drum_events += [(DRUM_SNARE, float(b), 0.4, v) for b, v in zip(snare_beats, snare_vels)]
+        drum_events += [(DRUM_HAT_CLOSED, t, 0.2, v) for t, v in zip(hat_times, hat_vels)]
+        drum_events += [(DRUM_TOM_MID, t, 0.3, 90) for t in fill_times]
 
         # Add crash cymbals for transitions
-        if section_type in ['intro', 'chorus', 'outro']:
-            if section_type == 'intro' and section_beats > 0:
-                drum_events.append((DRUM_NOTES['crash'], 0, 1.0, 127))
-            if section_type == 'outro' and section_beats > 1:
-                drum_events.append((DRUM_NOTES['crash'], section_beats - 1, 1.0, 127))
+        if section_type == 'intro' and section_beats > 0:
+            drum_events.append((DRUM_CRASH, 0, 1.0, 127))
+        elif section_type == 'outro' and section_beats > 1:
+            drum_events.append((DRUM_CRASH, section_beats - 1, 1.0, 127))
 
-        drum_events.sort(key=lambda x: x[1])
+        # Tanpa sort: tiap instrumen sudah urut waktu dan create_midi_file mengurutkan per tick (stabil)
         return drum_events[:int(section_beats * 8)]  # Limit drum events
 
     except Exception as e:
-        logger.error(f"Error in generate_drum_pattern_section: {e}")
+        logger.error("Error in generate_drum_pattern_section: %s", e)
         return []
 
+# Generator track berbasis akor: (track, fungsi(params, section_beats, chord_progression))
+SECTION_CHORD_GENERATORS = (
+    ('rhythm_primary', generate_rhythm_primary_section),
+    ('rhythm_secondary', generate_rhythm_secondary_section),
+    ('bass', generate_bass_line_section),
+)
+
+@lru_cache(maxsize=256)
+def _song_structure_for(chords):
+    """(sections, total beats) for a validated chord progression - CACHED (tuple, immutable)"""
+    target_beats = 240  # Reduced from 432 untuk performa (4 minutes at 120 BPM)
+
+    # Simplified structure: Intro -> Verse -> Chorus -> Verse -> Chorus -> Bridge -> Chorus -> Outro
+    structure = [
+        ('intro', 8, chords[:2] if len(chords) >= 2 else [CHORDS['C']]),
+        ('verse', 16, chords),
+        ('pre_chorus', 8, chords[-2:]),
+        ('chorus', 16, chords),
+        ('verse', 16, chords),
+        ('pre_chorus', 8, chords[-2:]),
+        ('chorus', 16, chords),
+        ('bridge', 16, chords[1:3] if len(chords) >= 3 else chords),
+        ('chorus', 16, chords),
+        ('outro', 8, [chords[-1]])
+    ]
+
+    total_beats = sum(section[1] for section in structure)
+    if total_beats < target_beats:
+        # Add extra chorus if needed
+        structure.insert(-2, ('chorus', 16, chords))
+        total_beats += 16
+
+    # Ensure all sections have valid chord progressions (validated once here, cached for generators)
+    return tuple((section_type, beats, validate_chord_progression(section_chords), section_type == 'bridge')
+                 for section_type, beats, section_chords in structure), total_beats
+
 def build_song_structure(params):
-    """Builds song structure - SIMPLIFIED untuk performa"""
+    """Builds song structure - SIMPLIFIED untuk performa (cached per chord progression)"""
     try:
-        target_beats = 240  # Reduced from 432 untuk performa (4 minutes at 120 BPM)
-        
-        # Simplified structure: Intro -> Verse -> Chorus -> Verse -> Chorus -> Bridge -> Chorus -> Outro
-        structure = [
-            ('intro', 8, params['chords'][:2] if len(params['chords']) >= 2 else [CHORDS['C']]),
-            ('verse', 16, params['chords']),
-            ('pre_chorus', 8, params['chords'][-2:]),
-            ('chorus', 16, params['chords']),
-            ('verse', 16, params['chords']),
-            ('pre_chorus', 8, params['chords'][-2:]),
-            ('chorus', 16, params['chords']),
-            ('bridge', 16, params['chords'][1:3] if len(params['chords']) >= 3 else params['chords']),
-            ('chorus', 16, params['chords']),
-            ('outro', 8, [params['chords'][-1]] if params['chords'] else [CHORDS['C']])
-        ]
-
-        total_beats = sum(section[1] for section in structure)
-        if total_beats < target_beats:
-            # Add extra chorus if needed
-            structure.insert(-2, ('chorus', 16, params['chords']))
-            total_beats += 16
-
-        # Ensure all sections have valid chord progressions
-        final_structure = []
-        for section_type, beats, chords in structure:
-            if not isinstance(chords, list) or len(chords) == 0:
-                chords = [CHORDS['C']]
-            final_structure.append((section_type, beats, chords, section_type == 'bridge'))
+        structure, total_beats = _song_structure_for(validate_chord_progression(params['chords']))
 
         params['duration_beats'] = total_beats
-        logger.info(f"Song structure built: {len(final_structure)} sections, total beats: {total_beats}, total seconds: {total_beats * 60 / params['tempo']:.1f}s")
-        return final_structure
+        logger.info("Song structure built: %s sections, total beats: %s, total seconds: %.1fs",
+                    len(structure), total_beats, total_beats * 60 / params['tempo'])
+        return list(structure)
 
     except Exception as e:
-        logger.error(f"Error in build_song_structure: {e}")
+        logger.error("Error in build_song_structure: %s", e)
         # Fallback simple structure
-        return [('verse', 64, [CHORDS['C']]), ('chorus', 64, [CHORDS['G']]), ('outro', 32, [CHORDS['C']])]
+        params['duration_beats'] = 160
+        return [('verse', 64, (CHORDS['C'],), False), ('chorus', 64, (CHORDS['G'],), False),
+                ('outro', 32, (CHORDS['C'],), False)]
+
+# Status byte (tanpa channel) untuk event yang ditulis langsung ke MIDI biner
+NOTE_OFF_STATUS = 0x80
+NOTE_ON_STATUS = 0x90
+PITCHWHEEL_STATUS = 0xE0
+MIDI_END_OF_TRACK = b'\xff\x2f\x00'
+
+def append_note_events(out, note_events, start_beat, ticks_per_beat):
+    """Append note_on/note_off (tick, status, note, velocity) pairs for section-relative note events"""
+    append = out.append
+    for note, rel_beat, dur, vel in note_events:
+        time_on = start_beat + rel_beat
+        append((int(time_on * ticks_per_beat + 0.5), NOTE_ON_STATUS, note, vel))
+        append((int((time_on + dur) * ticks_per_beat + 0.5), NOTE_OFF_STATUS, note, 0))
+
+def encode_vlq(value):
+    """MIDI variable-length quantity for a non-negative int"""
+    out = bytearray((value & 0x7F,))
+    value >>= 7
+    while value:
+        out.insert(0, 0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(out)
+
+# Delta time < 2^14 tick (dua byte VLQ) diambil dari tabel
+VLQ_TABLE = tuple(encode_vlq(i) for i in range(1 << 14))
+
+def encode_track(setup_messages, events, channel, total_ticks):
+    """MTrk chunk from mido setup messages plus sorted (tick, status, data1, data2) events, with running status"""
+    data = bytearray()
+    running_status = None
+    for msg in setup_messages:
+        data += VLQ_TABLE[msg.time] if msg.time < 16384 else encode_vlq(msg.time)
+        msg_bytes = msg.bytes()
+        if msg.is_meta:
+            data += bytes(msg_bytes)
+            running_status = None
+        else:
+            data += bytes(msg_bytes[1:] if msg_bytes[0] == running_status else msg_bytes)
+            running_status = msg_bytes[0]
+
+    current_tick = 0
+    for abs_tick, status, data1, data2 in events:
+        delta_tick = abs_tick - current_tick
+        data += VLQ_TABLE[delta_tick] if delta_tick < 16384 else encode_vlq(delta_tick)
+        status |= channel
+        if status != running_status:
+            data.append(status)
+            running_status = status
+        if status >> 4 == 0xE:
+            data1 += 8192  # Pitch bend: 14-bit unsigned, LSB lalu MSB
+            data.append(data1 & 0x7F)
+            data.append(data1 >> 7)
+        else:
+            data.append(data1)
+            data.append(data2)
+        current_tick = abs_tick
+
+    delta_tick = max(0, total_ticks - current_tick)
+    data += VLQ_TABLE[delta_tick] if delta_tick < 16384 else encode_vlq(delta_tick)
+    data += MIDI_END_OF_TRACK
+    return b'MTrk' + len(data).to_bytes(4, 'big') + data
+
+def write_midi_file(output_path, ticks_per_beat, track_chunks):
+    """Write a type-1 MIDI file from pre-encoded MTrk chunks"""
+    header = b'MThd' + (6).to_bytes(4, 'big') + (1).to_bytes(2, 'big') + \
+        len(track_chunks).to_bytes(2, 'big') + ticks_per_beat.to_bytes(2, 'big')
+    with open(output_path, 'wb') as f:
+        f.write(header)
+        for chunk in track_chunks:
+            f.write(chunk)
 
 def create_midi_file(params, output_path):
     """Create MIDI file - OPTIMIZED dengan timeout dan error handling"""
@@ -954,9 +1111,7 @@ def create_midi_file(params, output_path):
         tempo = params['tempo']
         ticks_per_beat = 480
 
-        mid = MidiFile(type=1, ticks_per_beat=ticks_per_beat)
-        
-        # Create tracks
+        # Create tracks (hanya untuk pesan setup; event note ditulis langsung ke MIDI biner)
         tracks = {
             'melody': MidiTrack(),
             'rhythm_primary': MidiTrack(),
@@ -964,45 +1119,43 @@ def create_midi_file(params, output_path):
             'bass': MidiTrack(),
             'drums': MidiTrack()
         }
-        
-        mid.tracks.extend([tracks['melody'], tracks['rhythm_primary'], tracks['rhythm_secondary'], 
-                          tracks['bass'], tracks['drums']])
+
 
         # Set tempo
         mido_tempo_us = bpm2tempo(tempo)
         tracks['melody'].append(MetaMessage('set_tempo', tempo=mido_tempo_us, time=0))
 
-        def beats_to_ticks(beats):
-            return int(round(beats * ticks_per_beat))
+        # beats -> ticks di-inline (semua waktu >= 0, jadi +0.5 lalu int() = pembulatan)
 
         # Setup instruments and controllers - SIMPLIFIED
+        instruments = params['instruments']
         # Melody (Channel 0)
-        prog = INSTRUMENTS.get(params['instruments']['melody'], 0)
+        prog = INSTRUMENTS.get(instruments['melody'], 0)
         tracks['melody'].append(Message('program_change', channel=0, program=prog, time=0))
         tracks['melody'].append(Message('control_change', channel=0, control=7, value=100, time=0))  # Volume
         tracks['melody'].append(Message('control_change', channel=0, control=10, value=64, time=0))  # Pan center
-        logger.info(f"Melody Track: {params['instruments']['melody']} (Pan: Center)")
+        logger.info("Melody Track: %s (Pan: Center)", instruments['melody'])
 
         # Rhythm Primary (Channel 1)
-        prog = INSTRUMENTS.get(params['instruments']['rhythm_primary'], 0)
+        prog = INSTRUMENTS.get(instruments['rhythm_primary'], 0)
         tracks['rhythm_primary'].append(Message('program_change', channel=1, program=prog, time=0))
         tracks['rhythm_primary'].append(Message('control_change', channel=1, control=7, value=90, time=0))
         tracks['rhythm_primary'].append(Message('control_change', channel=1, control=10, value=90, time=0))  # Pan right
-        logger.info(f"Rhythm Primary Track: {params['instruments']['rhythm_primary']} (Pan: Right)")
+        logger.info("Rhythm Primary Track: %s (Pan: Right)", instruments['rhythm_primary'])
 
         # Rhythm Secondary (Channel 2)
-        prog = INSTRUMENTS.get(params['instruments']['rhythm_secondary'], 0)
+        prog = INSTRUMENTS.get(instruments['rhythm_secondary'], 0)
         tracks['rhythm_secondary'].append(Message('program_change', channel=2, program=prog, time=0))
         tracks['rhythm_secondary'].append(Message('control_change', channel=2, control=7, value=75, time=0))
         tracks['rhythm_secondary'].append(Message('control_change', channel=2, control=10, value=40, time=0))  # Pan left-center
-        logger.info(f"Rhythm Secondary Track: {params['instruments']['rhythm_secondary']} (Pan: Left-Center)")
+        logger.info("Rhythm Secondary Track: %s (Pan: Left-Center)", instruments['rhythm_secondary'])
 
         # Bass (Channel 3)
-        prog = INSTRUMENTS.get(params['instruments']['bass'], 0)
+        prog = INSTRUMENTS.get(instruments['bass'], 0)
         tracks['bass'].append(Message('program_change', channel=3, program=prog, time=0))
         tracks['bass'].append(Message('control_change', channel=3, control=7, value=110, time=0))
         tracks['bass'].append(Message('control_change', channel=3, control=10, value=30, time=0))  # Pan left
-        logger.info(f"Bass Track: {params['instruments']['bass']} (Pan: Left)")
+        logger.info("Bass Track: %s (Pan: Left)", instruments['bass'])
 
         # Drums (Channel 9)
         tracks['drums'].append(Message('control_change', channel=9, control=7, value=120, time=0))
@@ -1022,216 +1175,485 @@ def create_midi_file(params, output_path):
             'drums': [],
             'pitch_bend': []
         }
+        # List output per track di-bind sekali (tanpa lookup dict per section)
+        melody_out, pitch_bend_out, drums_out = all_events['melody'], all_events['pitch_bend'], all_events['drums']
+        chord_track_generators = [(all_events[track_name], generate_section)
+                                  for track_name, generate_section in SECTION_CHORD_GENERATORS]
 
         # Generate events for each section - WITH TIMEOUT CHECK
         section_start_time = time.time()
         for section_idx, (section_type, section_beats, chord_progression, is_solo) in enumerate(song_structure):
             if time.time() - section_start_time > 30:  # 30 second timeout per section
-                logger.warning(f"Section {section_idx} timeout, skipping")
+                logger.warning("Section %s timeout, skipping", section_idx)
                 break
 
-            logger.info(f"Generating section: {section_type} for {section_beats} beats at beat {current_absolute_beat:.1f}")
+            logger.info("Generating section: %s for %s beats at beat %.1f", section_type, section_beats, current_absolute_beat)
 
             try:
                 # Melody
                 melody_events, pb_events = generate_melody_section(
                     params, section_beats, chord_progression, is_solo
                 )
-                for pitch, rel_beat, dur, vel in melody_events:
-                    time_on = current_absolute_beat + rel_beat
-                    time_off = time_on + dur
-                    all_events['melody'].append((beats_to_ticks(time_on), 
-                                               Message('note_on', channel=0, note=int(pitch), velocity=int(vel), time=0)))
-                    all_events['melody'].append((beats_to_ticks(time_off), 
-                                               Message('note_off', channel=0, note=int(pitch), velocity=0, time=0)))
-                
-                for rel_beat, bend_val in pb_events:
-                    all_events['pitch_bend'].append((beats_to_ticks(current_absolute_beat + rel_beat),
-                                                   Message('pitchwheel', channel=0, pitch=int(bend_val), time=0)))
-
-                # Rhythm Primary
-                rhythm_events = generate_rhythm_primary_section(params, section_beats, chord_progression)
-                for pitch, rel_beat, dur, vel in rhythm_events:
-                    time_on = current_absolute_beat + rel_beat
-                    time_off = time_on + dur
-                    all_events['rhythm_primary'].append((beats_to_ticks(time_on),
-                                                       Message('note_on', channel=1, note=int(pitch), velocity=int(vel), time=0)))
-                    all_events['rhythm_primary'].append((beats_to_ticks(time_off),
-                                                       Message('note_off', channel=1, note=int(pitch), velocity=0, time=0)))
-
-                # Rhythm Secondary
-                secondary_events = generate_rhythm_secondary_section(params, section_beats, chord_progression)
-                for pitch, rel_beat, dur, vel in secondary_events:
-                    time_on = current_absolute_beat + rel_beat
-                    time_off = time_on + dur
-                    all_events['rhythm_secondary'].append((beats_to_ticks(time_on),
-                                                         Message('note_on', channel=2, note=int(pitch), velocity=int(vel), time=0)))
-                    all_events['rhythm_secondary'].append((beats_to_ticks(time_off),
-                                                         Message('note_off', channel=2, note=int(pitch), velocity=0, time=0)))
-
-                # Bass
-                bass_events = generate_bass_line_section(params, section_beats, chord_progression)
-                for pitch, rel_beat, dur, vel in bass_events:
-                    time_on = current_absolute_beat + rel_beat
-                    time_off = time_on + dur
-                    all_events['bass'].append((beats_to_ticks(time_on),
-                                             Message('note_on', channel=3, note=int(pitch), velocity=int(vel), time=0)))
-                    all_events['bass'].append((beats_to_ticks(time_off),
-                                             Message('note_off', channel=3, note=int(pitch), velocity=0, time=0)))
+                append_note_events(melody_out, melody_events, current_absolute_beat, ticks_per_beat)
+                pitch_bend_out += [(int((current_absolute_beat + rel_beat) * ticks_per_beat + 0.5),
+                                    PITCHWHEEL_STATUS, bend_val, 0)
+                                   for rel_beat, bend_val in pb_events]
+
+                # Rhythm Primary, Rhythm Secondary, Bass (urutan tetap, sama dengan urutan draw RNG)
+                for track_out, generate_section in chord_track_generators:
+                    append_note_events(track_out,
+                                       generate_section(params, section_beats, chord_progression),
+                                       current_absolute_beat, ticks_per_beat)
 
                 # Drums
-                drum_events = generate_drum_pattern_section(params, section_type, section_beats)
-                for note, rel_beat, dur, vel in drum_events:
-                    time_on = current_absolute_beat + rel_beat
-                    time_off = time_on + dur
-                    all_events['drums'].append((beats_to_ticks(time_on),
-                                              Message('note_on', channel=9, note=int(note), velocity=int(vel), time=0)))
-                    all_events['drums'].append((beats_to_ticks(time_off),
-                                              Message('note_off', channel=9, note=int(note), velocity=0, time=0)))
+                append_note_events(drums_out,
+                                   generate_drum_pattern_section(params, section_type, section_beats),
+                                   current_absolute_beat, ticks_per_beat)
 
                 current_absolute_beat += section_beats
 
             except Exception as e:
-                logger.error(f"Error generating section {section_type}: {e}")
+                logger.error("Error generating section %s: %s", section_type, e)
                 continue
 
-        # Process events for each track
-        def process_track_events(track, events, channel):
-            if not events:
-                return
-            events.sort(key=lambda x: x[0])
-            current_tick = 0
-            for abs_tick, msg in events:
-                delta_tick = max(0, int(abs_tick - current_tick))
-                msg.time = delta_tick
-                track.append(msg)
-                current_tick = abs_tick
-
-        # Add events to tracks
-        process_track_events(tracks['melody'], all_events['melody'] + all_events['pitch_bend'], 0)
-        process_track_events(tracks['rhythm_primary'], all_events['rhythm_primary'], 1)
-        process_track_events(tracks['rhythm_secondary'], all_events['rhythm_secondary'], 2)
-        process_track_events(tracks['bass'], all_events['bass'], 3)
-        process_track_events(tracks['drums'], all_events['drums'], 9)
-
-        # Add end of track
-        total_ticks = beats_to_ticks(current_absolute_beat)
-        for track in mid.tracks:
-            if len(track) == 0 or not isinstance(track[-1], MetaMessage):
-                end_delta = max(0, total_ticks - sum(msg.time for msg in track))
-                track.append(MetaMessage('end_of_track', time=end_delta))
+        # Event disimpan sebagai tuple (tick, status, data1, data2) dan langsung di-encode ke MTrk
+        # tanpa membuat objek Message per event; sort stabil per track dengan key C-level
+        # List event di-pop per track setelah di-encode agar memori tuple dilepas sebelum track berikutnya
+        all_events['melody'] += all_events.pop('pitch_bend')
+        del melody_out, pitch_bend_out, drums_out, chord_track_generators
+        total_ticks = int(current_absolute_beat * ticks_per_beat + 0.5)
+        track_chunks = []
+        for track_name, channel in (('melody', 0), ('rhythm_primary', 1), ('rhythm_secondary', 2),
+                                    ('bass', 3), ('drums', 9)):
+            events = all_events.pop(track_name)
+            events.sort(key=itemgetter(0))
+            track_chunks.append(encode_track(tracks[track_name], events, channel, total_ticks))
+            del events
 
         # Save MIDI
-        mid.save(output_path)
+        write_midi_file(output_path, ticks_per_beat, track_chunks)
         generation_time = time.time() - start_time
-        logger.info(f"MIDI generated successfully in {generation_time:.1f}s (Total Beats: {current_absolute_beat}): {output_path.name}")
+        logger.info("MIDI generated successfully in %.1fs (Total Beats: %s): %s", generation_time, current_absolute_beat, output_path.name)
         return True
 
     except Exception as e:
-        logger.error(f"Critical error in create_midi_file: {e}", exc_info=True)
+        logger.error("Critical error in create_midi_file: %s", e, exc_info=True)
         return False
 
-# [Fungsi audio processing tetap sama seperti sebelumnya]
+JOB_PARAM_FIELDS = ('tempo', 'duration_beats', 'selected_progression')
 
-def midi_to_audio_subprocess(midi_path, output_wav_path, soundfont_path):
-    """ARM64-optimized FluidSynth - WITH TIMEOUT"""
-    if not soundfont_path.exists() or not midi_path.exists():
-        return False
+def generate_song_midi(genre_input, lyrics, tempo_input, midi_path):
+    """Worker entry point: detect genre, build params and write the MIDI file"""
+    genre = genre_input if genre_input != 'auto' else detect_genre_from_lyrics(lyrics)
+    params = get_music_params_from_lyrics(genre, lyrics, tempo_input)
+    midi_ok = create_midi_file(params, midi_path)
+    # Hanya field yang dipakai job yang dikirim balik (ChainMap/MappingProxyType tidak bisa di-pickle)
+    return genre, {key: params.get(key) for key in JOB_PARAM_FIELDS}, midi_ok
 
+def _warm_generation_worker():
+    """Load TextBlob corpora and the lookup caches once per worker process"""
     try:
-        cmd = [
-            'fluidsynth', '-F', str(output_wav_path),
-            '-o', 'audio.file.endian=little',
-            '-o', 'audio.file.format=s16',
-            '-o', 'synth.sample-rate=44100',
-            '-o', 'audio.period-size=512',
-            '-o', 'audio.periods=4',
-            '-o', 'synth.gain=1.2',  # Reduced gain untuk stabilitas
-            '-o', 'synth.midi-bank-select=gm',
-            '-a', 'null', '-ni',
-            str(soundfont_path), str(midi_path)
-        ]
-
-        logger.info("Rendering MIDI with FluidSynth...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)  # 2 minute timeout
-
-        if result.returncode == 0 and output_wav_path.exists() and output_wav_path.stat().st_size > 1000:
-            logger.info(f"WAV generated: {output_wav_path.name} ({output_wav_path.stat().st_size/1024:.1f} KB)")
-            return True
-        else:
-            logger.error(f"FluidSynth failed: {result.stderr}")
-            return False
-
-    except subprocess.TimeoutExpired:
-        logger.error("FluidSynth timeout (120s)")
-        return False
+        # Isi cache per genre (scale, progression, song structure) sebelum request pertama
+        for genre_params in GENRE_PARAMS.values():
+            for scale_name in ('major', 'minor'):
+                get_scale_notes(genre_params['key'], scale_name)
+            for chords in genre_params['chord_progressions_midi']:
+                _song_structure_for(validate_chord_progression(chords))
+        _analyze_lyrics("warm up the lyrics analyzer")
     except Exception as e:
-        logger.error(f"FluidSynth error: {e}")
-        return False
+        logger.warning("Generation worker warm-up failed: %s", e)
+
+# Generasi musik (CPU + TextBlob) di process pool agar tidak menahan GIL thread Flask;
+# satu core disisakan untuk thread Flask dan proses FluidSynth/ffmpeg
+GENERATION_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+GENERATION_TIMEOUT_SECONDS = 60
+_generation_pool_lock = threading.Lock()
+
+def _new_generation_pool():
+    return ProcessPoolExecutor(
+        max_workers=GENERATION_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_warm_generation_worker,
+    )
+
+GENERATION_POOL = _new_generation_pool()
+
+def restart_generation_pool(old_pool, cancel_futures=True):
+    """Swap in a fresh worker pool (worker mati / macet); no-op jika thread lain sudah menggantinya"""
+    global GENERATION_POOL
+    with _generation_pool_lock:
+        if GENERATION_POOL is old_pool:
+            GENERATION_POOL = _new_generation_pool()
+            logger.warning("Generation worker pool restarted")
+    # Worker lama yang masih berjalan dibiarkan selesai lalu keluar (tidak bisa dihentikan paksa)
+    old_pool.shutdown(wait=False, cancel_futures=cancel_futures)
+
+def _shutdown_generation_pool():
+    GENERATION_POOL.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(_shutdown_generation_pool)
 
-def midi_to_audio(midi_path, output_wav_path):
-    """Main MIDI to audio conversion"""
-    if not SOUNDFONT_PATH or not SOUNDFONT_PATH.exists():
-        logger.error("SoundFont not available")
-        return False
+# [Fungsi audio processing tetap sama seperti sebelumnya]
 
-    return midi_to_audio_subprocess(midi_path, output_wav_path, SOUNDFONT_PATH)
+# Render + encode: FluidSynth menulis PCM mentah ke pipe yang langsung dibaca ffmpeg (tanpa WAV di disk)
+RENDER_SAMPLE_RATE = 44100
+RENDER_CHANNELS = 2
+RENDER_TIMEOUT_SECONDS = 120
+# Ukuran blok file renderer FluidSynth (frame per write); periods hanya relevan untuk driver realtime
+RENDER_PERIOD_FRAMES = 4096
+MP3_BITRATE = '192k'
+# Buffer pipe FluidSynth -> ffmpeg (default Linux 64 KiB): lebih besar = lebih sedikit context switch
+RENDER_PIPE_BYTES = 1024 * 1024
+# Normalisasi single-pass (peak baru diketahui di akhir stream): window panjang (f x g) agar
+# mendekati peak-normalize statis, target peak 0.89 (~-1 dB headroom)
+MP3_NORMALIZE_FILTER = 'dynaudnorm=f=500:g=301:p=0.89'
+
+def build_mp3_encode_cmd(part_path):
+    """ffmpeg command encoding raw s16le PCM from stdin to a normalized MP3 (.part, format explicit)"""
+    return [
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 's16le', '-ar', str(RENDER_SAMPLE_RATE), '-ac', str(RENDER_CHANNELS), '-i', '-',
+        '-af', MP3_NORMALIZE_FILTER, '-codec:a', 'libmp3lame', '-b:a', MP3_BITRATE,
+        '-f', 'mp3', os.fspath(part_path)
+    ]
 
-def wav_to_mp3(wav_path, mp3_path):
-    """Convert WAV to MP3 - SIMPLIFIED untuk performa"""
-    try:
-        if not wav_path.exists() or wav_path.stat().st_size == 0:
-            return False
+def midi_to_mp3_pipeline(midi_path, mp3_path, soundfont_path):
+    """ARM64-optimized FluidSynth piped into ffmpeg MP3 encoder - WITH TIMEOUT"""
+    synth_cmd = [
+        # Fast file render (-F, tanpa driver realtime): -T raw tanpa header WAV, ffmpeg membaca s16le
+        'fluidsynth', '-q', '-F', '-', '-T', 'raw',
+        '-o', 'audio.file.endian=little',
+        '-o', 'audio.file.format=s16',
+        '-o', f'synth.sample-rate={RENDER_SAMPLE_RATE}',
+        '-o', f'audio.period-size={RENDER_PERIOD_FRAMES}',
+        '-o', 'synth.gain=1.2',  # Reduced gain untuk stabilitas
+        '-o', 'synth.midi-bank-select=gm',
+        '-a', 'null', '-ni',
+        os.fspath(soundfont_path), os.fspath(midi_path)
+    ]
+    # Encode ke .part lalu rename: URL /static/audio_output/<id>.mp3 tidak pernah melayani file setengah jadi
+    part_path = mp3_path.with_name(mp3_path.name + '.part')
+    encode_cmd = build_mp3_encode_cmd(part_path)
 
-        audio = AudioSegment.from_wav(wav_path)
-        
-        # Simple processing
-        if audio.max_dBFS < -20:
-            audio = audio + 20  # Boost if too quiet
-        
-        # Normalize
-        normalized = pydub_normalize(audio, headroom=1.0)
-        
-        # Export
-        normalized.export(mp3_path, format='mp3', bitrate='192k')
-        
-        if mp3_path.exists() and mp3_path.stat().st_size > 500:
-            logger.info(f"MP3 created: {mp3_path.name} ({mp3_path.stat().st_size/1024:.1f} KB)")
-            return True
-        else:
+    synth = encoder = None
+    # stderr FluidSynth ke file sementara: PIPE yang tidak dibaca bisa membuat proses macet
+    with tempfile.TemporaryFile() as synth_log:
+        try:
+            logger.info("Rendering MIDI with FluidSynth -> ffmpeg...")
+            deadline = time.monotonic() + RENDER_TIMEOUT_SECONDS
+            synth = subprocess.Popen(synth_cmd, stdout=subprocess.PIPE, stderr=synth_log)
+            if fcntl is not None and hasattr(fcntl, 'F_SETPIPE_SZ'):
+                try:
+                    fcntl.fcntl(synth.stdout.fileno(), fcntl.F_SETPIPE_SZ, RENDER_PIPE_BYTES)
+                except OSError:  # Melebihi /proc/sys/fs/pipe-max-size, tetap pakai default
+                    pass
+            encoder = subprocess.Popen(encode_cmd, stdin=synth.stdout,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            synth.stdout.close()  # Read-end hanya dipegang ffmpeg, FluidSynth dapat SIGPIPE jika ffmpeg berhenti
+
+            _, encode_stderr = encoder.communicate(timeout=RENDER_TIMEOUT_SECONDS)
+            synth.wait(timeout=max(1, deadline - time.monotonic()))
+
+            if synth.returncode != 0:
+                synth_log.seek(0)
+                logger.error("FluidSynth failed: %s", synth_log.read().decode(errors='replace'))
+                return False
+            if encoder.returncode != 0:
+                logger.error("ffmpeg MP3 encode failed: %s", encode_stderr.decode(errors='replace'))
+                return False
+
+            mp3_size = part_path.stat().st_size
+            if mp3_size > 500:
+                os.replace(part_path, mp3_path)  # Atomic rename
+                logger.info("MP3 created: %s (%.1f KB)", mp3_path.name, mp3_size/1024)
+                return True
+            else:
+                return False
+
+        except subprocess.TimeoutExpired:
+            logger.error("Render/encode timeout (%ss)", RENDER_TIMEOUT_SECONDS)
+            return False
+        except Exception as e:
+            logger.error("Render/encode error: %s", e)
             return False
+        finally:
+            for proc in (synth, encoder):
+                if proc is not None and proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+            part_path.unlink(missing_ok=True)  # Encode gagal: sisa .part dibuang
+
+# FluidSynth in-process (pyfluidsynth, opsional): SoundFont dimuat sekali lalu dipakai ulang antar request.
+# Satu synth dengan state channel bersama: render yang datang saat synth sibuk pakai proses fluidsynth
+RENDER_TAIL_SECONDS = 2.0  # Sisa release/reverb setelah event terakhir
+_persistent_synth = None  # None = belum dicoba, False = gagal load, (synth, sfid) = siap
+_persistent_synth_lock = threading.Lock()
+_synth_render_lock = threading.Lock()
+
+def get_persistent_synth():
+    """Shared (synth, sfid) with the SoundFont preloaded, or None if pyfluidsynth is unavailable"""
+    global _persistent_synth
+    # Di bawah gevent render in-process (panggilan C panjang) akan menahan event loop: pakai CLI
+    if not FLUIDSYNTH_BINDING_AVAILABLE or not SOUNDFONT_PATH_STR or GEVENT_SERVER:
+        return None
+    with _persistent_synth_lock:
+        if _persistent_synth is None:
+            _persistent_synth = False
+            try:
+                synth = pyfluidsynth_lib.Synth(gain=1.2, samplerate=float(RENDER_SAMPLE_RATE))
+                sfid = synth.sfload(SOUNDFONT_PATH_STR)
+                if sfid == -1:
+                    synth.delete()
+                    logger.error("Failed to load SoundFont with pyfluidsynth")
+                else:
+                    _persistent_synth = (synth, sfid)
+                    logger.info("SoundFont preloaded in persistent FluidSynth (ID: %s)", sfid)
+            except Exception as e:
+                logger.error("pyfluidsynth init error: %s", e)
+    return _persistent_synth or None
+
+def _write_synth_frames(synth, pcm_out, frames, deadline):
+    """Render `frames` stereo frames from the synth into pcm_out in bounded blocks"""
+    while frames > 0:
+        if time.monotonic() > deadline:
+            raise TimeoutError("persistent FluidSynth render timeout")
+        block = min(frames, RENDER_PERIOD_FRAMES)
+        pcm_out.write(synth.get_samples(block).tobytes())
+        frames -= block
+
+def render_midi_persistent(midi_path, pcm_out, deadline):
+    """Render a MIDI file as s16le stereo PCM into pcm_out using the shared synth (caller holds _synth_render_lock)"""
+    synth, sfid = get_persistent_synth()
+    synth.system_reset()  # Bersihkan note/controller dari render sebelumnya
+    for channel in range(16):
+        synth.program_select(channel, sfid, 128 if channel == 9 else 0, 0)
+
+    # Iterasi MidiFile memberi delta waktu dalam detik (tempo map sudah diterapkan)
+    elapsed = 0.0
+    frames_done = 0
+    for msg in MidiFile(midi_path):
+        elapsed += msg.time
+        target_frames = int(elapsed * RENDER_SAMPLE_RATE)
+        _write_synth_frames(synth, pcm_out, target_frames - frames_done, deadline)
+        frames_done = target_frames
+        if msg.type == 'note_on':
+            synth.noteon(msg.channel, msg.note, msg.velocity)
+        elif msg.type == 'note_off':
+            synth.noteoff(msg.channel, msg.note)
+        elif msg.type == 'control_change':
+            synth.cc(msg.channel, msg.control, msg.value)
+        elif msg.type == 'program_change':
+            synth.program_change(msg.channel, msg.program)
+        elif msg.type == 'pitchwheel':
+            synth.pitch_bend(msg.channel, msg.pitch)
+    _write_synth_frames(synth, pcm_out, int(RENDER_TAIL_SECONDS * RENDER_SAMPLE_RATE), deadline)
+
+def midi_to_mp3_persistent(midi_path, mp3_path):
+    """Render with the preloaded in-process FluidSynth, streaming PCM into ffmpeg - WITH TIMEOUT"""
+    # Synth sedang dipakai render lain: jangan antre (deadline/encoder belum jalan), caller fallback ke pipeline
+    if not _synth_render_lock.acquire(blocking=False):
+        logger.debug("Persistent FluidSynth busy, using fluidsynth process")
+        return False
+    encoder = None
+    part_path = mp3_path.with_name(mp3_path.name + '.part')
+    with tempfile.TemporaryFile() as encode_log:
+        try:
+            logger.info("Rendering MIDI with persistent FluidSynth -> ffmpeg...")
+            deadline = time.monotonic() + RENDER_TIMEOUT_SECONDS
+            encoder = subprocess.Popen(build_mp3_encode_cmd(part_path), stdin=subprocess.PIPE,
+                                       stdout=subprocess.DEVNULL, stderr=encode_log)
+            try:
+                render_midi_persistent(midi_path, encoder.stdin, deadline)
+            finally:
+                encoder.stdin.close()
+            encoder.wait(timeout=max(1, deadline - time.monotonic()))
+
+            if encoder.returncode != 0:
+                encode_log.seek(0)
+                logger.error("ffmpeg MP3 encode failed: %s", encode_log.read().decode(errors='replace'))
+                return False
+
+            mp3_size = part_path.stat().st_size
+            if mp3_size > 500:
+                os.replace(part_path, mp3_path)  # Atomic rename
+                logger.info("MP3 created: %s (%.1f KB)", mp3_path.name, mp3_size/1024)
+                return True
+            else:
+                return False
 
-    except Exception as e:
-        logger.error(f"WAV to MP3 error: {e}")
+        except (subprocess.TimeoutExpired, TimeoutError):
+            logger.error("Render/encode timeout (%ss)", RENDER_TIMEOUT_SECONDS)
+            return False
+        except Exception as e:
+            logger.error("Persistent render/encode error: %s", e)
+            return False
+        finally:
+            if encoder is not None and encoder.poll() is None:
+                encoder.kill()
+                encoder.wait()
+            part_path.unlink(missing_ok=True)  # Encode gagal: sisa .part dibuang
+            _synth_render_lock.release()
+
+# Maksimum render FluidSynth -> ffmpeg bersamaan (masing-masing memakai satu core penuh);
+# job yang datang bersamaan antre di RENDER_EXECUTOR, bukan menjalankan N FluidSynth yang berebut CPU
+RENDER_CONCURRENCY = max(1, (os.cpu_count() or 1) // 2)
+
+def midi_to_mp3(midi_path, mp3_path):
+    """Main MIDI to MP3 conversion"""
+    if not SOUNDFONT_PATH_STR:
+        logger.error("SoundFont not available")
         return False
 
+    # Synth persistent (tanpa load SoundFont per request), fallback ke proses fluidsynth
+    if get_persistent_synth() is not None and midi_to_mp3_persistent(midi_path, mp3_path):
+        return True
+    return midi_to_mp3_pipeline(midi_path, mp3_path, SOUNDFONT_PATH_STR)
+
+# Tabel header frame MPEG audio Layer III (kbps / Hz), index = field di header
+MP3_BITRATES_KBPS = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),      # MPEG-2
+    0: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),      # MPEG-2.5
+}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def mp3_duration_seconds(mp3_path):
+    """MP3 duration from the first frame header and Xing/Info tag (CBR estimate otherwise); None if unreadable"""
+    try:
+        with open(mp3_path, 'rb') as f:
+            head = f.read(10)
+            audio_start = 0
+            if head[:3] == b'ID3':
+                # ID3v2: ukuran synchsafe (7 bit per byte), +10 header, +10 footer jika flag di-set
+                audio_start = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+                if head[5] & 0x10:
+                    audio_start += 10
+            f.seek(audio_start)
+            frame = f.read(192)
+            file_size = os.fstat(f.fileno()).st_size
+
+        if len(frame) < 4 or frame[0] != 0xFF or frame[1] & 0xE0 != 0xE0 or (frame[1] >> 1) & 3 != 1:
+            return None  # Bukan frame MPEG Layer III
+        version = (frame[1] >> 3) & 3
+        bitrate_kbps = MP3_BITRATES_KBPS[version][frame[2] >> 4]
+        sample_rate = MP3_SAMPLE_RATES[version][(frame[2] >> 2) & 3]
+        mono = frame[3] >> 6 == 3
+        samples_per_frame = 1152 if version == 3 else 576
+
+        # Xing/Info tag (ditulis LAME/ffmpeg) berisi jumlah frame: durasi tepat tanpa decode
+        xing_offset = 4 + (17 if mono else 32) if version == 3 else 4 + (9 if mono else 17)
+        tag = frame[xing_offset:xing_offset + 12]
+        if tag[:4] in (b'Xing', b'Info') and int.from_bytes(tag[4:8], 'big') & 1:
+            return int.from_bytes(tag[8:12], 'big') * samples_per_frame / sample_rate
+        if bitrate_kbps:
+            return (file_size - audio_start) * 8 / (bitrate_kbps * 1000)
+        return None
+    except (OSError, IndexError, KeyError):
+        return None
+
+# Ekstensi file hasil generate yang dibersihkan (pathlib glob tidak mendukung brace "{mp3,wav,mid}");
+# .json = sidecar metadata cache
+CLEANUP_SUFFIXES = frozenset(('.mp3', '.wav', '.mid', '.part', '.json', '.tmp'))
+CLEANUP_MAX_AGE_HOURS = 24
+CLEANUP_INTERVAL_SECONDS = 3600
+
 def cleanup_old_files(directory, max_age_hours=24):
     """Clean up old files"""
     try:
-        logger.info(f"Cleaning old files in {directory}")
-        cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+        logger.info("Cleaning old files in %s", directory)
+        cutoff_ts = time.time() - max_age_hours * 3600
         deleted = 0
 
-        for file_path in Path(directory).glob("*.{mp3,wav,mid}"):
-            try:
-                if datetime.fromtimestamp(file_path.stat().st_mtime) < cutoff_time:
-                    file_path.unlink()
-                    deleted += 1
-            except:
-                pass
+        # os.scandir: satu readdir, suffix dicek dari nama entry sebelum stat
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1] not in CLEANUP_SUFFIXES:
+                    continue
+                try:
+                    if entry.stat(follow_symlinks=False).st_mtime < cutoff_ts:
+                        os.unlink(entry.path)
+                        deleted += 1
+                except OSError:
+                    pass
 
-        logger.info(f"Cleanup complete: {deleted} files deleted")
+        logger.info("Cleanup complete: %s files deleted", deleted)
     except Exception as e:
-        logger.error(f"Cleanup error: {e}")
-
-def generate_unique_id(lyrics):
-    """Generate unique ID"""
-    return f"{hashlib.md5(lyrics.encode()).hexdigest()[:8]}_{int(time.time())}"
-
-@app.route('/')
-def index():
-    """Main interface with improved timeout handling"""
-    html_template = """
+        logger.error("Cleanup error: %s", e)
+
+def _cleanup_loop():
+    """Daemon thread: cleanup saat startup lalu tiap CLEANUP_INTERVAL_SECONDS, di luar jalur startup/request"""
+    while True:
+        cleanup_old_files(AUDIO_OUTPUT_DIR, max_age_hours=CLEANUP_MAX_AGE_HOURS)
+        time.sleep(CLEANUP_INTERVAL_SECONDS)
+
+_cleanup_thread = None
+_cleanup_thread_lock = threading.Lock()
+
+def start_cleanup_thread():
+    """Start the cleanup daemon once per server process (juga saat di-load gunicorn, tanpa main_app_runner)"""
+    global _cleanup_thread
+    with _cleanup_thread_lock:
+        if _cleanup_thread is None:
+            _cleanup_thread = threading.Thread(target=_cleanup_loop, name='audio-cleanup', daemon=True)
+            _cleanup_thread.start()
+
+# Worker process pool (spawn) ikut meng-import modul ini: cleanup hanya di proses server
+if multiprocessing.parent_process() is None:
+    start_cleanup_thread()
+
+@lru_cache(maxsize=512)
+def generate_unique_id(lyrics, genre_input, tempo_input):
+    """Content-hash ID of a request (lirik, genre, tempo): dipakai untuk nama file dan cache"""
+    return hashlib.blake2b(f"{lyrics}|{genre_input}|{tempo_input}".encode(), digest_size=12).hexdigest()
+
+# Cache hasil per content-hash: MP3 + sidecar JSON metadata di disk, metadata juga di memori (LRU)
+SONG_CACHE_SIZE = 128
+_song_cache = OrderedDict()
+_song_cache_lock = threading.Lock()
+
+def _remember_song(unique_id, result):
+    with _song_cache_lock:
+        _song_cache[unique_id] = result
+        _song_cache.move_to_end(unique_id)
+        while len(_song_cache) > SONG_CACHE_SIZE:
+            _song_cache.popitem(last=False)
+
+def get_cached_song(unique_id):
+    """Cached response for a request if its MP3 still exists (mtime di-refresh agar tidak ikut cleanup)"""
+    sidecar_path = os.path.join(AUDIO_OUTPUT_DIR_STR, f"{unique_id}.json")
+    with _song_cache_lock:
+        result = _song_cache.get(unique_id)
+        if result is not None:
+            _song_cache.move_to_end(unique_id)
+    try:
+        if result is None:
+            # Miss di memori (mis. setelah restart): baca sidecar, tanpa decode MP3
+            with open(sidecar_path, 'rb') as f:
+                result = json.load(f)
+            _remember_song(unique_id, result)
+        os.utime(os.path.join(AUDIO_OUTPUT_DIR_STR, result['filename']))
+        os.utime(sidecar_path)
+    except (OSError, ValueError, KeyError):  # Belum ada, sudah dihapus cleanup, atau sidecar rusak
+        with _song_cache_lock:
+            _song_cache.pop(unique_id, None)
+        return None
+    return result
+
+def store_cached_song(unique_id, result):
+    """Persist a successful response as a sidecar next to its MP3 and remember it in the LRU"""
+    sidecar_path = os.path.join(AUDIO_OUTPUT_DIR_STR, f"{unique_id}.json")
+    try:
+        # Tulis ke file sementara lalu rename agar pembaca tidak melihat JSON setengah jadi
+        tmp_path = f"{sidecar_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, sidecar_path)
+    except OSError as e:
+        logger.warning("Failed to write cache sidecar for %s: %s", unique_id, e)
+    _remember_song(unique_id, result)
+
+# Halaman utama: template di-compile Jinja sekali saat import, bukan per request
+INDEX_HTML = """
 <!DOCTYPE html>
 <html lang="id">
 <head>
@@ -1332,7 +1754,75 @@ def index():
             document.getElementById('charCount').textContent = `${textInput.value.length} karakter`;
         });
 
-        // Form submission with 7-minute timeout
+        function showResult(data) {
+            statusMsg.innerHTML = '<p class="text-green-600">🎉 Instrumental berhasil dibuat!</p>';
+            audioSection.style.display = 'block';
+
+            // Update metadata
+            document.getElementById('genreDisplay').textContent = data.genre || 'N/A';
+            document.getElementById('tempoDisplay').textContent = `${data.tempo || 'N/A'} BPM`;
+            document.getElementById('durationDisplay').textContent = `${data.duration || 'N/A'} detik`;
+            document.getElementById('sizeDisplay').textContent = `${data.size || 'N/A'} KB`;
+
+            // Setup audio
+            audioPlayer.src = `/static/audio_output/${data.filename}`;
+            audioPlayer.load();
+            downloadBtn.disabled = false;
+
+            downloadBtn.onclick = () => {
+                const link = document.createElement('a');
+                link.href = `/static/audio_output/${data.filename}?dl=1`;
+                link.download = `instrumental_${data.id}.mp3`;
+                link.click();
+            };
+
+            // Initialize wavesurfer if available
+            if (typeof Wavesurfer !== 'undefined') {
+                wavesurfer = Wavesurfer.create({
+                    container: '#waveform',
+                    waveColor: '#4f46e5',
+                    progressColor: '#10b981',
+                    height: 80,
+                    barWidth: 2,
+                    normalize: true
+                });
+
+                wavesurfer.load(audioPlayer.src);
+                wavesurfer.on('ready', () => {
+                    console.log('Waveform loaded');
+                });
+            }
+        }
+
+        // Pesan status berisi data dari server: pakai textContent, bukan innerHTML
+        function setStatus(className, text) {
+            const p = document.createElement('p');
+            p.className = className;
+            p.textContent = text;
+            statusMsg.replaceChildren(p);
+        }
+
+        // Progress job via Server-Sent Events; resolve dengan event terakhir (done)
+        function followProgress(jobId) {
+            return new Promise((resolve, reject) => {
+                const es = new EventSource(`/progress/${jobId}`);
+                es.onmessage = (event) => {
+                    const msg = JSON.parse(event.data);
+                    if (msg.done) {
+                        es.close();
+                        resolve(msg);
+                        return;
+                    }
+                    setStatus('text-blue-600', `⏳ ${msg.message} (${msg.pct}%)`);
+                };
+                es.onerror = () => {
+                    es.close();
+                    reject(new Error('Koneksi progress terputus'));
+                };
+            });
+        }
+
+        // Form submission: server langsung mengembalikan job_id, progress diikuti lewat SSE
         form.addEventListener('submit', async (e) => {
             e.preventDefault();
             
@@ -1352,216 +1842,281 @@ def index():
                 wavesurfer = null;
             }
 
-            const controller = new AbortController();
-            const timeoutId = setTimeout(() => {
-                controller.abort();
-                statusMsg.innerHTML = `
-                    <p class="text-red-600">⏰ Proses melebihi batas waktu (7 menit)</p>
-                    <p class="text-sm text-gray-600 mt-1">Server mungkin masih memproses. Coba refresh halaman dalam 1-2 menit atau kurangi panjang lirik.</p>
-                `;
-                generateBtn.disabled = false;
-                spinner.classList.add('hidden');
-            }, 7 * 60 * 1000); // 7 minutes
-
             try {
                 const response = await fetch('/generate-instrumental', {
                     method: 'POST',
-                    body: formData,
-                    signal: controller.signal
+                    body: formData
                 });
+                let data = await response.json();
 
-                clearTimeout(timeoutId);
-                spinner.classList.add('hidden');
-
-                if (response.ok) {
-                    const data = await response.json();
-                    
+                if (!response.ok) {
+                    setStatus('text-red-600', `❌ Server Error: ${data.error || 'Unknown error'}`);
+                } else {
+                    // 202: job baru/berjalan; 200: hasil cache langsung
+                    if (data.job_id) {
+                        data = await followProgress(data.job_id);
+                    }
                     if (data.success) {
-                        statusMsg.innerHTML = '<p class="text-green-600">🎉 Instrumental berhasil dibuat!</p>';
-                        audioSection.style.display = 'block';
-                        
-                        // Update metadata
-                        document.getElementById('genreDisplay').textContent = data.genre || 'N/A';
-                        document.getElementById('tempoDisplay').textContent = `${data.tempo || 'N/A'} BPM`;
-                        document.getElementById('durationDisplay').textContent = `${data.duration || 'N/A'} detik`;
-                        document.getElementById('sizeDisplay').textContent = `${data.size || 'N/A'} KB`;
-                        
-                        // Setup audio
-                        audioPlayer.src = `/static/audio_output/${data.filename}`;
-                        audioPlayer.load();
-                        downloadBtn.disabled = false;
-                        
-                        downloadBtn.onclick = () => {
-                            const link = document.createElement('a');
-                            link.href = `/static/audio_output/${data.filename}`;
-                            link.download = `instrumental_${data.id}.mp3`;
-                            link.click();
-                        };
-
-                        // Initialize wavesurfer if available
-                        if (typeof Wavesurfer !== 'undefined') {
-                            wavesurfer = Wavesurfer.create({
-                                container: '#waveform',
-                                waveColor: '#4f46e5',
-                                progressColor: '#10b981',
-                                height: 80,
-                                barWidth: 2,
-                                normalize: true
-                            });
-                            
-                            wavesurfer.load(audioPlayer.src);
-                            wavesurfer.on('ready', () => {
-                                console.log('Waveform loaded');
-                            });
-                        }
-
+                        showResult(data);
                     } else {
-                        statusMsg.innerHTML = `<p class="text-red-600">❌ ${data.error || 'Gagal generate'}</p>`;
+                        setStatus('text-red-600', `❌ ${data.error || 'Gagal generate'}`);
                     }
-                } else {
-                    const errorData = await response.json();
-                    statusMsg.innerHTML = `<p class="text-red-600">❌ Server Error: ${errorData.error || 'Unknown error'}</p>`;
                 }
             } catch (error) {
-                clearTimeout(timeoutId);
-                spinner.classList.add('hidden');
-                generateBtn.disabled = false;
-                
-                if (error.name === 'AbortError') {
-                    statusMsg.innerHTML = `
-                        <p class="text-yellow-600">⏰ Timeout (7 menit)</p>
-                        <p class="text-sm text-gray-600 mt-1">Proses mungkin masih berjalan. Tunggu 1-2 menit lalu refresh.</p>
-                    `;
-                } else {
-                    statusMsg.innerHTML = `<p class="text-red-600">🌐 Network Error: ${error.message}</p>`;
-                }
+                setStatus('text-red-600', `🌐 Network Error: ${error.message}`);
             }
-            
+
+            spinner.classList.add('hidden');
             generateBtn.disabled = false;
         });
     </script>
 </body>
 </html>
 """
-    return render_template_string(html_template)
-
-@app.route('/generate-instrumental', methods=['OPTIONS', 'POST'])
-def generate_instrumental_endpoint():
-    """Main endpoint - WITH COMPREHENSIVE ERROR HANDLING"""
-    if request.method == 'OPTIONS':
-        return '', 200
+INDEX_TEMPLATE = app.jinja_env.from_string(INDEX_HTML)
+# Halaman statis: render + gzip sekali, dikirim apa adanya ke client yang menerima gzip
+INDEX_BODY = INDEX_TEMPLATE.render().encode()
+INDEX_GZIP = gzip.compress(INDEX_BODY, 9)
 
+@app.route('/')
+def index():
+    """Main interface with improved timeout handling"""
+    if request.accept_encodings['gzip']:
+        response = Response(INDEX_GZIP, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(INDEX_BODY, mimetype='text/html')
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# Job generate di background: progress disimpan per job dan di-stream oleh /progress/<job_id> (SSE).
+# Thread hanya mengorkestrasi; kerja berat ada di GENERATION_POOL dan subprocess FluidSynth/ffmpeg.
+# Dua tahap: MIDI job berikutnya sudah jalan di JOB_EXECUTOR selagi job sebelumnya render/encode
+JOB_RETENTION_SECONDS = 15 * 60
+SSE_KEEPALIVE_SECONDS = 15
+JOB_EXECUTOR = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix='song-job')
+RENDER_EXECUTOR = ThreadPoolExecutor(max_workers=RENDER_CONCURRENCY, thread_name_prefix='song-render')
+atexit.register(JOB_EXECUTOR.shutdown, wait=False, cancel_futures=True)
+atexit.register(RENDER_EXECUTOR.shutdown, wait=False, cancel_futures=True)
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def create_job(job_id):
+    """Register a progress record for job_id (pruning expired jobs); returns (job, created)"""
+    now = time.monotonic()
+    with _jobs_lock:
+        for stale_id in [jid for jid, job in _jobs.items() if now - job['created'] > JOB_RETENTION_SECONDS]:
+            del _jobs[stale_id]
+        job = _jobs.get(job_id)
+        if job is not None and not (job['events'] and job['events'][-1].get('done')):
+            return job, False  # Masih berjalan
+        job = {'events': [], 'cond': threading.Condition(), 'created': now}
+        _jobs[job_id] = job
+        return job, True
+
+def publish_job_event(job, event):
+    """Append a progress event and wake SSE subscribers"""
+    with job['cond']:
+        job['events'].append(event)
+        job['cond'].notify_all()
+
+def fail_generation_job(job, message, *cleanup):
+    """Remove partial files and publish the terminal error event"""
+    for path in cleanup:
+        path.unlink(missing_ok=True)
+    publish_job_event(job, {'stage': 'error', 'pct': 100, 'done': True, 'success': False, 'error': message})
+
+def run_generation_job(job, unique_id, lyrics, genre_input, tempo_input):
+    """Background stage 1: MIDI in the worker pool, then hand off to RENDER_EXECUTOR"""
     start_time = time.time()
-    logger.info("Receiving POST request to /generate-instrumental")
+    paths = {
+        'midi': AUDIO_OUTPUT_DIR / f"{unique_id}.mid",
+        'mp3': AUDIO_OUTPUT_DIR / f"{unique_id}.mp3"
+    }
 
     try:
-        data = request.form if request.form else request.json
-        lyrics = data.get('lyrics', '').strip()
-        genre_input = data.get('genre', 'auto').lower()
-        tempo_input = data.get('tempo', 'auto')
-
-        if not lyrics or len(lyrics) < 5:  # Reduced minimum length
-            return jsonify({'error': 'Lirik minimal 5 karakter'}), 400
+        logger.info("Starting generation for ID: %s", unique_id)
 
-        logger.info(f"Processing lyrics: '{lyrics[:50]}...' ({len(lyrics)} chars)")
-        logger.info(f"Input: Genre='{genre_input}', Tempo='{tempo_input}'")
-
-        # Detect genre and get parameters
-        genre = genre_input if genre_input != 'auto' else detect_genre_from_lyrics(lyrics)
-        params = get_music_params_from_lyrics(genre, lyrics, tempo_input)
-
-        # Generate unique ID and paths
-        unique_id = generate_unique_id(lyrics)
-        midi_filename = f"{unique_id}.mid"
-        wav_filename = f"{unique_id}.wav"
-        mp3_filename = f"{unique_id}.mp3"
+        # Step 1: Detect genre, build params and generate MIDI in the worker pool (timeout: 60s)
+        logger.info("1. Generating MIDI file...")
+        publish_job_event(job, {'stage': 'midi', 'pct': 10, 'message': 'Membuat MIDI...'})
+        midi_ok = False
+        for attempt in range(2):  # Satu kali submit ulang jika worker pool rusak
+            pool = GENERATION_POOL
+            try:
+                future = pool.submit(generate_song_midi, genre_input, lyrics, tempo_input, paths['midi'])
+                genre, params, midi_ok = future.result(timeout=GENERATION_TIMEOUT_SECONDS)
+                break
+            except BrokenProcessPool:
+                # Worker mati (OOM-kill, segfault): pool tidak bisa dipakai lagi sampai diganti
+                logger.error("Generation worker pool broken (attempt %s), restarting", attempt + 1)
+                restart_generation_pool(pool)
+            except FutureTimeoutError:
+                # cancel() tidak menghentikan worker yang sedang jalan; slotnya tetap terpakai
+                # sampai selesai, jadi job berikutnya diarahkan ke pool baru
+                future.cancel()
+                logger.error("MIDI generation timeout (%ss); worker still busy, recycling the pool",
+                             GENERATION_TIMEOUT_SECONDS)
+                restart_generation_pool(pool, cancel_futures=False)
+                break
+        if not midi_ok:
+            return fail_generation_job(job, 'Gagal membuat file MIDI. Coba lirik yang lebih sederhana.', paths['midi'])
 
-        paths = {
-            'midi': AUDIO_OUTPUT_DIR / midi_filename,
-            'wav': AUDIO_OUTPUT_DIR / wav_filename,
-            'mp3': AUDIO_OUTPUT_DIR / mp3_filename
-        }
+        # Render di antrean terpisah: thread ini langsung bebas untuk MIDI job berikutnya
+        publish_job_event(job, {'stage': 'queued', 'pct': 30, 'message': 'Menunggu antrean render...'})
+        RENDER_EXECUTOR.submit(render_generation_job, job, unique_id, paths, genre, params, start_time)
 
-        logger.info(f"Starting generation for ID: {unique_id}")
+    except Exception as e:
+        logger.error("Critical generation error: %s", e, exc_info=True)
+        # Cleanup any partial files
+        fail_generation_job(job, f'Error internal: {str(e)[:100]}', *paths.values())
 
-        # Step 1: Generate MIDI (timeout: 60s)
-        logger.info("1. Generating MIDI file...")
-        if not create_midi_file(params, paths['midi']):
-            if paths['midi'].exists():
-                paths['midi'].unlink(missing_ok=True)
-            return jsonify({'error': 'Gagal membuat file MIDI. Coba lirik yang lebih sederhana.'}), 500
-
-        # Step 2: Render to audio (timeout: 120s)
-        logger.info("2. Rendering MIDI to audio...")
-        if not SOUNDFONT_PATH or not SOUNDFONT_PATH.exists():
-            paths['midi'].unlink(missing_ok=True)
-            return jsonify({'error': 'SoundFont tidak ditemukan'}), 500
-
-        if not midi_to_audio(paths['midi'], paths['wav']):
-            paths['midi'].unlink(missing_ok=True)
-            return jsonify({'error': 'Gagal render audio. Pastikan FluidSynth terinstall.'}), 500
-
-        # Step 3: Convert to MP3 (timeout: 30s)
-        logger.info("3. Converting to MP3...")
-        if not wav_to_mp3(paths['wav'], paths['mp3']):
-            for path in [paths['midi'], paths['wav']]:
-                if path.exists():
-                    path.unlink(missing_ok=True)
-            return jsonify({'error': 'Gagal konversi MP3. Pastikan FFmpeg terinstall.'}), 500
+def render_generation_job(job, unique_id, paths, genre, params, start_time):
+    """Background stage 2: FluidSynth/ffmpeg MP3 render, duration and result caching"""
+    try:
+        # Step 2: Render + encode MP3 dalam satu pipeline FluidSynth -> ffmpeg (timeout: 120s)
+        logger.info("2. Rendering MIDI to MP3...")
+        if not SOUNDFONT_PATH_STR:
+            return fail_generation_job(job, 'SoundFont tidak ditemukan', paths['midi'])
+
+        # Hanya nama genre yang dikenal masuk ke pesan (genre mentah berasal dari input user)
+        genre_label = genre if genre in GENRE_PARAMS else 'pop'
+        publish_job_event(job, {'stage': 'render', 'pct': 40,
+                                'message': f'Render audio {genre_label} ({params["tempo"]} BPM)...'})
+        if not midi_to_mp3(paths['midi'], paths['mp3']):
+            return fail_generation_job(job, 'Gagal render audio. Pastikan FluidSynth dan FFmpeg terinstall.',
+                                       paths['midi'], paths['mp3'])
 
         # Cleanup temporary files
-        for temp_path in [paths['midi'], paths['wav']]:
-            if temp_path.exists():
-                temp_path.unlink(missing_ok=True)
+        paths['midi'].unlink(missing_ok=True)
+        publish_job_event(job, {'stage': 'finalize', 'pct': 90, 'message': 'Menyelesaikan file MP3...'})
 
-        # Calculate duration
-        duration_seconds = params['duration_beats'] * 60 / params['tempo']
-        try:
-            if paths['mp3'].exists():
-                test_audio = AudioSegment.from_mp3(paths['mp3'])
-                duration_seconds = len(test_audio) / 1000.0
-        except:
-            pass
+        # Calculate duration dari header MP3 (tanpa decode), fallback estimasi dari jumlah beat
+        duration_seconds = mp3_duration_seconds(paths['mp3'])
+        if duration_seconds is None:
+            duration_seconds = params['duration_beats'] * 60 / params['tempo']
 
         total_time = time.time() - start_time
-        mp3_size_kb = paths['mp3'].stat().st_size / 1024 if paths['mp3'].exists() else 0
+        try:
+            mp3_size_kb = paths['mp3'].stat().st_size / 1024
+        except OSError:
+            mp3_size_kb = 0
 
-        logger.info(f"Generation complete in {total_time:.1f}s! ID: {unique_id}, File: {mp3_filename} ({mp3_size_kb:.1f} KB, {duration_seconds:.1f}s)")
+        logger.info("Generation complete in %.1fs! ID: %s, File: %s (%.1f KB, %.1fs)",
+                    total_time, unique_id, paths['mp3'].name, mp3_size_kb, duration_seconds)
 
-        return jsonify({
+        result = {
             'success': True,
-            'filename': mp3_filename,
+            'filename': paths['mp3'].name,
             'genre': genre,
             'tempo': params['tempo'],
             'duration': round(duration_seconds, 1),
             'id': unique_id,
             'size': round(mp3_size_kb),
             'progression': ' '.join(params.get('selected_progression', ['C']))
-        })
+        }
+        store_cached_song(unique_id, result)
+        publish_job_event(job, {'stage': 'done', 'pct': 100, 'done': True, **result})
 
     except Exception as e:
-        logger.error(f"Critical generation error: {e}", exc_info=True)
+        logger.error("Critical generation error: %s", e, exc_info=True)
         # Cleanup any partial files
-        for path in paths.values():
-            if path and path.exists():
-                try:
-                    path.unlink()
-                except:
-                    pass
+        fail_generation_job(job, f'Error internal: {str(e)[:100]}', *paths.values())
+
+@app.route('/generate-instrumental', methods=['OPTIONS', 'POST'])
+def generate_instrumental_endpoint():
+    """Main endpoint - enqueue generation, return job_id (202) or cached result (200)"""
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    start_time = time.time()
+    logger.info("Receiving POST request to /generate-instrumental")
+
+    try:
+        data = request.form if request.form else request.json
+        lyrics = data.get('lyrics', '').strip()
+        genre_input = data.get('genre', 'auto').lower()
+        tempo_input = data.get('tempo', 'auto')
+
+        if not lyrics or len(lyrics) < 5:  # Reduced minimum length
+            return jsonify({'error': 'Lirik minimal 5 karakter'}), 400
+
+        logger.info("Processing lyrics: '%s...' (%s chars)", lyrics[:50], len(lyrics))
+        logger.info("Input: Genre='%s', Tempo='%s'", genre_input, tempo_input)
+
+        # Request identik (content-hash sama): kembalikan MP3 yang sudah ada tanpa generate/render ulang
+        unique_id = generate_unique_id(lyrics, genre_input, tempo_input)
+        cached_result = get_cached_song(unique_id)
+        if cached_result is not None:
+            logger.info("Cache hit: %s (%.3fs)", cached_result['filename'], time.time() - start_time)
+            return jsonify({**cached_result, 'cached': True})
+
+        # Job ID = content-hash; request identik yang masih berjalan memakai job yang sama
+        job, created = create_job(unique_id)
+        if created:
+            JOB_EXECUTOR.submit(run_generation_job, job, unique_id, lyrics, genre_input, tempo_input)
+            logger.info("Queued generation job: %s", unique_id)
+
+        return jsonify({'job_id': unique_id}), 202
+
+    except Exception as e:
+        logger.error("Critical generation error: %s", e, exc_info=True)
         return jsonify({'error': f'Error internal: {str(e)[:100]}'}), 500
 
+@app.route('/progress/<job_id>')
+def job_progress(job_id):
+    """Server-Sent Events stream of a generation job's progress"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job tidak ditemukan'}), 404
+
+    def stream():
+        sent = 0
+        while True:
+            with job['cond']:
+                job['cond'].wait_for(lambda: len(job['events']) > sent, timeout=SSE_KEEPALIVE_SECONDS)
+                events = job['events'][sent:]
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            sent += len(events)
+            for event in events:
+                yield f"data: {json.dumps(event)}\n\n"
+            if events[-1].get('done'):
+                return
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Nama file = content-hash request, isinya tidak berubah selama file hidup (maks. umur cleanup)
+AUDIO_CACHE_CONTROL = f'public, max-age={CLEANUP_MAX_AGE_HOURS * 3600}, immutable'
+
 @app.route('/static/audio_output/<filename>')
 def serve_audio(filename):
-    """Serve audio files"""
+    """Serve audio files (inline untuk <audio>, attachment dengan ?dl=1)"""
     try:
-        file_path = AUDIO_OUTPUT_DIR / filename
-        if not file_path.exists():
-            return "File not found", 404
-
         mimetype = 'audio/mpeg' if filename.endswith('.mp3') else 'audio/wav'
-        return send_from_directory(AUDIO_OUTPUT_DIR, filename, mimetype=mimetype, as_attachment=True)
+        download = bool(request.args.get('dl'))
+        if AUDIO_ACCEL_REDIRECT_PREFIX:
+            # nginx mengirim file dari location internal (sendfile + Range); Flask hanya validasi nama
+            file_path = safe_join(AUDIO_OUTPUT_DIR_STR, filename)
+            if file_path is None or not os.path.isfile(file_path):
+                raise NotFound()
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = AUDIO_ACCEL_REDIRECT_PREFIX + filename
+            if download:
+                response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        else:
+            # conditional=True: Range request (seek di <audio>) dan 304 dari werkzeug, tanpa baca ulang file penuh
+            response = send_from_directory(AUDIO_OUTPUT_DIR_STR, filename, mimetype=mimetype,
+                                           as_attachment=download, conditional=True)
+        response.headers['Cache-Control'] = AUDIO_CACHE_CONTROL
+        return response
+    except NotFound:
+        return "File not found", 404
     except Exception as e:
-        logger.error(f"Error serving {filename}: {e}")
+        logger.error("Error serving %s: %s", filename, e)
         return "Server error", 500
 
 def get_local_ip():
@@ -1580,24 +2135,30 @@ def main_app_runner():
     """Startup with system checks"""
     logger.info("Starting Flask Generate Instrumental AI! 🚀")
     logger.info("  ✅ FIXED: Chord progression handling + Performance optimization")
-    logger.info("  ✅ NEW: 7-minute timeout + Memory-efficient generation")
+    logger.info("  ✅ NEW: Background jobs + SSE progress + Memory-efficient generation")
     logger.info("  ✅ ARM64: Optimized for mobile/ARM devices")
 
     try:
         if SOUNDFONT_PATH:
-            logger.info(f"✅ SoundFont: {SOUNDFONT_PATH.name}")
+            logger.info("✅ SoundFont: %s", SOUNDFONT_PATH.name)
         else:
             logger.warning("⚠️  No SoundFont found - download required")
 
         check_python_dependencies()
-        cleanup_old_files(AUDIO_OUTPUT_DIR, max_age_hours=24)
+        start_cleanup_thread()
 
-        logger.info(f"🚀 Server ready! http://{get_local_ip()}:5000")
-        logger.info(f"Available genres: {list(GENRE_PARAMS.keys())}")
+        # Load SoundFont ke FluidSynth persistent sekali saat startup
+        if get_persistent_synth() is not None:
+            logger.info("✅ FluidSynth: persistent synth ready (pyfluidsynth)")
+        else:
+            logger.info("FluidSynth: using fluidsynth CLI per render")
+
+        logger.info("🚀 Server ready! http://%s:5000", get_local_ip())
+        logger.info("Available genres: %s", list(GENRE_PARAMS.keys()))
         logger.info("💡 Tip: Generation takes 2-4 minutes. Be patient! ⏳")
 
     except Exception as e:
-        logger.error(f"Startup error: {e}")
+        logger.error("Startup error: %s", e)
         return False
 
     return True
@@ -1605,10 +2166,18 @@ def main_app_runner():
 if __name__ == '__main__':
     if main_app_runner():
         try:
-            app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+            if GEVENT_SERVER:
+                # Greenlet per koneksi: job render dan stream SSE menunggu secara kooperatif, bukan per thread OS
+                from gevent.pywsgi import WSGIServer
+                logger.info("Serving with gevent WSGIServer")
+                WSGIServer(('0.0.0.0', 5000), app).serve_forever()
+            else:
+                logger.warning("Using Flask development server. For production: GEVENT_SERVER=1 python app-rabu3.py "
+                               "or GEVENT_SERVER=1 gunicorn -k gevent -w 1 --timeout 600 'app-rabu3:app'")
+                app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
         except KeyboardInterrupt:
             logger.info("Server stopped by user")
         except Exception as e:
-            logger.error(f"Server error: {e}")
+            logger.error("Server error: %s", e)
     else:
         sys.exit(1)